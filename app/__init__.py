@@ -6,9 +6,15 @@ import os
 from flask import Flask
 from flask_cors import CORS
 from flask_socketio import SocketIO
+from app import json_codec
 
 socketio = None
 
+# Largest Socket.IO packet we accept. Real payloads (join, chat, moves) are
+# well under 1 KB; anything bigger is dropped by the server before it is
+# decoded into a dict
+MAX_PACKET_BYTES = int(os.environ.get('MAX_PACKET_BYTES', 16 * 1024))
+
 def create_app(config=None):
     """Create and configure Flask application"""
     app = Flask(__name__)
@@ -23,37 +29,58 @@ def create_app(config=None):
     
     # Initialize Socket.IO
     global socketio
-    # Use threading async mode for compatibility across all platforms
-    # Threading is reliable and works with standard gunicorn sync worker
+    # Eventlet gives us native WebSocket transport; set ASYNC_MODE=threading
+    # to fall back to the standard gunicorn sync worker
+    async_mode = os.environ.get('ASYNC_MODE', 'eventlet')
+    # WebSocket only: skips the polling handshake + upgrade round-trips.
+    # Set SUPPORT_POLLING=1 for legacy networks that block WebSockets
+    transports = ['websocket']
+    if os.environ.get('SUPPORT_POLLING'):
+        transports.append('polling')
+    # Pages hand this to the JS client (body data-transports); with polling
+    # allowed the client starts on polling and upgrades, so it connects even
+    # where WebSockets are blocked
+    app.config['SOCKETIO_CLIENT_TRANSPORTS'] = ','.join(reversed(transports))
+    # With REDIS_URL set, emits fan out through Redis pub/sub so several
+    # worker processes can serve the same rooms
+    message_queue = os.environ.get('REDIS_URL')
     socketio = SocketIO(
         app,
-        async_mode='threading',
+        async_mode=async_mode,
         cors_allowed_origins='*',
         ping_timeout=60,
         ping_interval=25,
-        transports=['websocket', 'polling'],
+        transports=transports,
+        max_http_buffer_size=MAX_PACKET_BYTES,
+        message_queue=message_queue,
+        json=json_codec,  # orjson for every packet encode/decode
         engineio_logger=False,
         manage_session=False,  # Allow two tabs from same browser
         logger=False
     )
     
     # Register blueprints
-    from app.routes import main_bp
+    from app.routes import main_bp, prerender_pages
     app.register_blueprint(main_bp)
+    prerender_pages(app)
     
-    # Register Socket.IO events
+    # Register Socket.IO events. Import exactly one handler module: the
+    # alternatives (socketio_events_rps, socketio_events_v2) handle the same
+    # event names, and state they share lives in app.session
     from app import socketio_events
     
     # Load persisted rooms from storage on startup
     from app import room_storage
-    from app.room_manager import room_manager
+    from app.room_manager import room_manager, Room
+    
+    # Restore rooms to in-memory storage in one go: no per-room storage read
+    restored = {room_id: Room(room_id) for room_id in room_storage.iter_room_ids()}
+    room_manager.restore_rooms(restored)
     
-    active_rooms = room_storage.get_all_rooms()
-    for room_id in active_rooms:
-        # Restore room to in-memory storage
-        room_manager.get_room(room_id)
+    # Sweep expired rooms periodically
+    socketio.start_background_task(room_manager.cleanup_loop)
     
-    if active_rooms:
-        app.logger.info(f"Loaded {len(active_rooms)} persisted rooms from storage")
+    if restored:
+        app.logger.info(f"Loaded {len(restored)} persisted rooms from storage")
     
     return app, socketio
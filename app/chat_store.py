@@ -0,0 +1,146 @@
+"""
+PlaySync - Shared chat history store
+One in-memory SQLite table holds the chat of every room, so all event
+modules see the same history and memory stays bounded no matter how many
+rooms come and go. Old messages are trimmed by a background task rather
+than on every append.
+
+When REDIS_URL is set the history lives in Redis instead (one capped list
+per room with a TTL), so every worker process shares it.
+"""
+
+import orjson
+import sqlite3
+import threading
+import time
+
+CHAT_HISTORY_SIZE = 50  # Messages kept per room
+CHAT_MAX_LENGTH = 200  # Characters per message
+CHAT_TTL_SECONDS = 24 * 60 * 60  # Same lifetime as a persisted room
+TRIM_INTERVAL_SECONDS = 30
+
+
+def now_ms():
+    """Wall-clock milliseconds as an int; encodes shorter than a float timestamp"""
+    return time.time_ns() // 1_000_000
+
+
+class ChatStore:
+    """Rolling per-room chat history backed by SQLite"""
+
+    def __init__(self, path=':memory:'):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS chat ('
+            'id INTEGER PRIMARY KEY, room_id TEXT, ts_ms INTEGER, player_id TEXT, '
+            'display_name TEXT, avatar_color TEXT, message TEXT)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_chat_room_id ON chat(room_id, id)')
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._trim_started = False
+
+    def append(self, room_id, entry):
+        """Store a chat entry ({player_id, display_name, avatar_color, message, ts_ms})"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO chat (room_id, ts_ms, player_id, display_name, avatar_color, message) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (room_id, entry.get('ts_ms') or now_ms(), entry.get('player_id'),
+                 entry.get('display_name'), entry.get('avatar_color'), entry.get('message'))
+            )
+            if not self._trim_started:
+                self._trim_started = True
+                from app import socketio
+                socketio.start_background_task(self._trim_loop)
+
+    def recent(self, room_id, limit=CHAT_HISTORY_SIZE):
+        """Last `limit` messages of a room, oldest first"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT player_id, display_name, avatar_color, message, ts_ms FROM chat '
+                'WHERE room_id = ? ORDER BY id DESC LIMIT ?',
+                (room_id, limit)
+            ).fetchall()
+        return [
+            {
+                'player_id': player_id,
+                'display_name': display_name,
+                'avatar_color': avatar_color,
+                'message': message,
+                'ts_ms': ts_ms
+            }
+            for player_id, display_name, avatar_color, message, ts_ms in reversed(rows)
+        ]
+
+    def forget(self, room_id):
+        """Drop a disposed room's history right away"""
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM chat WHERE room_id = ?', (room_id,))
+
+    def trim(self):
+        """Drop messages past each room's window and anything older than a room's lifetime"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                'DELETE FROM chat WHERE ts_ms < ? OR id IN ('
+                'SELECT id FROM (SELECT id, ROW_NUMBER() OVER '
+                '(PARTITION BY room_id ORDER BY id DESC) AS rn FROM chat) '
+                'WHERE rn > ?)',
+                (now_ms() - CHAT_TTL_SECONDS * 1000, CHAT_HISTORY_SIZE)
+            )
+
+    def _trim_loop(self):
+        """Background task: trim every TRIM_INTERVAL_SECONDS"""
+        from app import socketio
+        while True:
+            socketio.sleep(TRIM_INTERVAL_SECONDS)
+            self.trim()
+
+
+class RedisChatStore:
+    """Same interface as ChatStore, one Redis list per room (chat:{room_id})"""
+
+    def __init__(self, client):
+        self.r = client
+
+    @staticmethod
+    def _key(room_id):
+        return f"chat:{room_id}"
+
+    def append(self, room_id, entry):
+        """Store a chat entry; the list is capped and expires with the room"""
+        key = self._key(room_id)
+        payload = orjson.dumps({
+            'player_id': entry.get('player_id'),
+            'display_name': entry.get('display_name'),
+            'avatar_color': entry.get('avatar_color'),
+            'message': entry.get('message'),
+            'ts_ms': entry.get('ts_ms') or now_ms()
+        })
+        pipe = self.r.pipeline(transaction=False)
+        pipe.rpush(key, payload)
+        pipe.ltrim(key, -CHAT_HISTORY_SIZE, -1)
+        pipe.expire(key, CHAT_TTL_SECONDS)
+        pipe.execute()
+
+    def recent(self, room_id, limit=CHAT_HISTORY_SIZE):
+        """Last `limit` messages of a room, oldest first"""
+        return [orjson.loads(item) for item in self.r.lrange(self._key(room_id), -limit, -1)]
+
+    def forget(self, room_id):
+        """Drop a disposed room's history right away"""
+        self.r.delete(self._key(room_id))
+
+    def trim(self):
+        """Nothing to do: append caps each list and Redis expires idle ones"""
+
+
+def _make_store():
+    # Reuse the room storage client (and its connection pool) when Redis is configured
+    from app import room_storage
+    if room_storage.r is not None:
+        return RedisChatStore(room_storage.r)
+    return ChatStore()
+
+
+chat_store = _make_store()
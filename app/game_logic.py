@@ -6,7 +6,19 @@ Server-side game state management and validation
 import random
 import time
 import threading
+import logging
 from enum import Enum
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class MoveResult(NamedTuple):
+    """Outcome of GameManager.process_move"""
+    valid: bool
+    message: str
+    data: dict = {}  # Game-specific extras for the client; never mutated
+
 
 class GameManager:
     """Base class for game managers - handles game-specific logic"""
@@ -19,7 +31,7 @@ class GameManager:
         pass
     
     def process_move(self, player_id, move_data):
-        """Process a player's move. Return {'valid': bool, 'message': str}"""
+        """Process a player's move. Return a MoveResult"""
         pass
     
     def is_game_complete(self):
@@ -29,12 +41,16 @@ class GameManager:
     def get_results(self):
         """Get final results/winner"""
         return None
+    
+    def set_ready(self):
+        """Signal that players are ready (only reaction time uses this)"""
+        pass
 
 
 class RockPaperScissorsManager(GameManager):
     """Rock Paper Scissors - Best of N"""
     
-    VALID_MOVES = ["rock", "paper", "scissors"]
+    VALID_MOVES = frozenset(("rock", "paper", "scissors"))
     BEATS = {"rock": "scissors", "scissors": "paper", "paper": "rock"}
     
     def __init__(self, room, best_of=3):
@@ -66,11 +82,12 @@ class RockPaperScissorsManager(GameManager):
         client_round = move_data.get('round')
         if client_round is not None and client_round != self.current_round:
             # Reject moves that are for different rounds
-            print(f"[RPS] Rejecting move from {player_id} for round {client_round} (current={self.current_round})")
-            return {'valid': False, 'message': 'Move belongs to a different round'}
+            logger.debug("RPS: rejecting move from %s for round %s (current=%s)",
+                         player_id, client_round, self.current_round)
+            return MoveResult(False, 'Move belongs to a different round')
         
         if move not in self.VALID_MOVES:
-            return {'valid': False, 'message': 'Invalid move'}
+            return MoveResult(False, 'Invalid move')
         
         # Make changes atomically with a lock since events can be processed concurrently
         with self._lock:
@@ -79,25 +96,28 @@ class RockPaperScissorsManager(GameManager):
                 self.round_choices = {'round': self.current_round, 'choices': {}}
 
             if player_id in self.round_choices['choices']:
-                return {'valid': False, 'message': 'Already submitted for this round'}
+                return MoveResult(False, 'Already submitted for this round')
 
             self.round_choices['choices'][player_id] = move
             # update state_data so client sees when a player has submitted for the current round
             if self.room.current_game:
                 self.room.current_game.state_data['choices'] = self.round_choices['choices']
-        print(f"[RPS] Move recorded for player {player_id}: {move}. Round {self.current_round} choices: {len(self.round_choices['choices'])}/{len(self.room.players)}")
+        logger.debug("RPS: move recorded for player %s: %s. Round %s choices: %d/%d",
+                     player_id, move, self.current_round,
+                     len(self.round_choices['choices']), len(self.room.players))
         
         # Check if both players have submitted
         # If this move completes the round, resolve it under the lock
         if len(self.round_choices['choices']) == len(self.room.players):
-            print(f"[RPS] Both players submitted, resolving round...")
+            logger.debug("RPS: both players submitted, resolving round")
             with self._lock:
                 # Double-check the set of choices is still for the current round (no race)
                 if self.round_choices.get('round') == self.current_round and len(self.round_choices['choices']) == len(self.room.players):
                     self._resolve_round()
-            print(f"[RPS] After resolve: round={self.current_round}, scores={self.room.current_game.player_scores}")
+            logger.debug("RPS: after resolve: round=%s, scores=%s",
+                         self.current_round, self.room.current_game.player_scores)
         
-        return {'valid': True, 'message': 'Choice recorded'}
+        return MoveResult(True, 'Choice recorded')
     
     def _resolve_round(self):
         """Determine winner of current round"""
@@ -164,7 +184,8 @@ class RockPaperScissorsManager(GameManager):
         max_score = max(scores)
         threshold = self.best_of // 2
         is_complete = max_score > threshold
-        print(f"[RPS] is_game_complete check: scores={self.room.current_game.player_scores}, max={max_score}, threshold={threshold}, complete={is_complete}")
+        logger.debug("RPS: is_game_complete check: scores=%s, max=%s, threshold=%s, complete=%s",
+                     self.room.current_game.player_scores, max_score, threshold, is_complete)
         return is_complete
     
     def get_results(self):
@@ -229,19 +250,19 @@ class TicTacToeManager(GameManager):
         """Process a board move"""
         player_ids = list(self.room.players.keys())
         if len(player_ids) < 2:
-            return {'valid': False, 'message': 'Not enough players'}
+            return MoveResult(False, 'Not enough players')
         
         # Check turn
         current = player_ids[self.current_player_index % 2]
         if player_id != current:
-            return {'valid': False, 'message': 'Not your turn'}
+            return MoveResult(False, 'Not your turn')
         
         position = move_data.get('position')
         if not isinstance(position, int) or position < 0 or position > 8:
-            return {'valid': False, 'message': 'Invalid position'}
+            return MoveResult(False, 'Invalid position')
         
         if self.board[position] != '':
-            return {'valid': False, 'message': 'Position already taken'}
+            return MoveResult(False, 'Position already taken')
         
         symbol = self.player_to_symbol[player_id]
         self.board[position] = symbol
@@ -255,7 +276,7 @@ class TicTacToeManager(GameManager):
         next_player = player_ids[self.current_player_index % 2]
         self.room.current_game.state_data['current_player'] = next_player
         
-        return {'valid': True, 'message': 'Move accepted'}
+        return MoveResult(True, 'Move accepted')
     
     def _check_winner(self):
         """Check if there's a winner"""
@@ -322,23 +343,23 @@ class ReactionTimeManager(GameManager):
     def process_move(self, player_id, move_data):
         """Record a tap reaction"""
         if not self.started:
-            return {'valid': False, 'message': 'Game not started'}
+            return MoveResult(False, 'Game not started')
         
         current_time = time.time() * 1000  # ms
         elapsed = current_time - self.start_time
         
         # Anti-cheat: disqualify if tapped before delay or if already recorded
         if player_id in self.reaction_times:
-            return {'valid': False, 'message': 'Already recorded'}
+            return MoveResult(False, 'Already recorded')
         
         if elapsed < self.delay_ms:
-            return {'valid': False, 'message': 'Too early - disqualified', 'early_tap': True}
+            return MoveResult(False, 'Too early - disqualified', {'early_tap': True})
         
         reaction_ms = elapsed - self.delay_ms
         self.reaction_times[player_id] = reaction_ms
         self.room.current_game.state_data['reactions'][player_id] = reaction_ms
         
-        return {'valid': True, 'message': 'Reaction recorded', 'reaction_ms': reaction_ms}
+        return MoveResult(True, 'Reaction recorded', {'reaction_ms': reaction_ms})
     
     def is_game_complete(self):
         """Game ends when both players have tapped"""
@@ -387,12 +408,12 @@ class QuickMathManager(GameManager):
     def process_move(self, player_id, move_data):
         """Check answer"""
         if player_id in self.answers:
-            return {'valid': False, 'message': 'Already answered'}
+            return MoveResult(False, 'Already answered')
         
         try:
             answer = int(move_data.get('answer', 0))
         except (ValueError, TypeError):
-            return {'valid': False, 'message': 'Invalid answer format'}
+            return MoveResult(False, 'Invalid answer format')
         
         self.answers[player_id] = answer
         correct = answer == self.correct_answer
@@ -402,11 +423,7 @@ class QuickMathManager(GameManager):
         
         self.room.current_game.state_data['answered_count'] = len(self.answers)
         
-        return {
-            'valid': True,
-            'correct': correct,
-            'message': 'Answer recorded'
-        }
+        return MoveResult(True, 'Answer recorded', {'correct': correct})
     
     def is_game_complete(self):
         """Game ends when first player answers correctly or timeout"""
@@ -497,10 +514,10 @@ class WouldYouRatherManager(GameManager):
         choice = move_data.get('choice')  # 'a' or 'b'
         
         if choice not in ['a', 'b']:
-            return {'valid': False, 'message': 'Invalid choice'}
+            return MoveResult(False, 'Invalid choice')
         
         if player_id in self.choices:
-            return {'valid': False, 'message': 'Already answered'}
+            return MoveResult(False, 'Already answered')
         
         self.choices[player_id] = choice
         
@@ -509,7 +526,7 @@ class WouldYouRatherManager(GameManager):
             self._resolve_round()
         
         self.room.current_game.state_data['choices'] = self.choices
-        return {'valid': True, 'message': 'Choice recorded'}
+        return MoveResult(True, 'Choice recorded')
     
     def _resolve_round(self):
         """Resolve current round"""
@@ -0,0 +1,18 @@
+"""
+PlaySync - orjson-backed JSON module for Socket.IO
+python-socketio calls json.dumps(data, separators=...) and json.loads(s)
+on every packet; this exposes the same two functions on top of orjson.
+"""
+
+import orjson
+
+
+def dumps(obj, *args, **kwargs):
+    """Encode to a JSON str (orjson output is always compact)"""
+    # No default=: unserializable values raise TypeError, like json.dumps
+    return orjson.dumps(obj).decode()
+
+
+def loads(s, *args, **kwargs):
+    """Decode JSON from str or bytes"""
+    return orjson.loads(s)
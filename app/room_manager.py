@@ -4,13 +4,34 @@ Room Manager: Persistent room storage and player lifecycle management
 Uses file-based storage to survive app restarts on Render free tier
 """
 
-import uuid
-import random
-import string
+import os
+import sys
 import time
-from datetime import datetime, timedelta
+import heapq
+import threading
+from datetime import datetime
 from enum import Enum
 from app import room_storage
+from app.chat_store import chat_store
+
+try:
+    from fastrlock.rlock import FastRLock
+except ImportError:  # pragma: no cover - C extension not available
+    FastRLock = threading.RLock
+
+# Room ID alphabet: 32 chars without confusing 0/O, 1/I
+_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+ROOM_ID_LENGTH = 8
+
+
+def looks_like_room_id(room_id):
+    """Cheap shape check to reject junk room codes before any lookup"""
+    return len(room_id) == ROOM_ID_LENGTH and room_id.isascii()
+
+# Events emitted through Room.emit within this window go out as one 'batch' message,
+# or sooner once BATCH_MAX_EVENTS have piled up
+BATCH_WINDOW_SECONDS = 0.01
+BATCH_MAX_EVENTS = 32
 
 class GameType(Enum):
     ROCK_PAPER_SCISSORS = "rps"
@@ -21,6 +42,9 @@ class GameType(Enum):
 
 class PlayerSlot:
     """Represents a player in a room"""
+    __slots__ = ('player_id', 'display_name', 'avatar_color', 'socket_id',
+                 'score', 'is_ready', 'is_active', 'joined_at')
+    
     def __init__(self, player_id, display_name, avatar_color):
         self.player_id = player_id
         self.display_name = display_name
@@ -33,9 +57,13 @@ class PlayerSlot:
 
 class GameState:
     """Manages state for the current game"""
+    __slots__ = ('game_type', 'started_at', 'started_at_iso', 'player_scores',
+                 'round_data', 'results', 'state_data')
+    
     def __init__(self, game_type):
         self.game_type = game_type
         self.started_at = datetime.now()
+        self.started_at_iso = self.started_at.isoformat()
         self.player_scores = {}
         self.round_data = {}
         self.results = None
@@ -45,17 +73,109 @@ class Room:
     """Represents an ephemeral game room"""
     def __init__(self, room_id, max_players=2, inactivity_timeout_seconds=1200):
         self.room_id = room_id
-        self.created_at = datetime.now()
-        self.last_activity = datetime.now()
+        self.created_at = datetime.now()  # Wall clock, only used for serialization
+        self.created_at_iso = self.created_at.isoformat()
+        self.last_activity = time.monotonic()
         self.max_players = max_players
         self.inactivity_timeout = inactivity_timeout_seconds
         
         self.players = {}  # {player_id: PlayerSlot}
         self.player_order = []  # Track join order
+        # Per-player fields kept parallel to player_order, so serializing the
+        # roster is one zip with no dict lookups
+        self._names = []
+        self._colors = []
+        self._scores = []
+        self._ready = []
+        self._active = []
+        # Bumped on every roster change (join, leave, ready reset) so the
+        # serialized player list is rebuilt only when it can differ
+        self.version = 0
+        self._players_serialized = None  # (version, list) from get_players_list
         self.current_game = None  # GameState or None
+        self._game_manager = None  # game_logic.GameManager driving current_game
         self.game_history = []  # Log of past games
+        self._game_history_serialized = []  # JSON-ready snapshot of game_history
         self.cumulative_scores = {}  # Track scores between games
         
+        # QR code for the room page, generated on first visit
+        self.qr_code_url = None
+        self.qr_code_b64 = None
+        
+        # Guards the roster and game state; taken per room so two rooms never
+        # contend. Lock order is RoomManager._lock -> Room._lock.
+        # FastRLock: C-level fast path when uncontended, which is the norm
+        self._lock = FastRLock()
+        self._closed = False  # Set once the manager drops the room
+        
+        # Called with the room whenever last_activity moves (set by RoomManager)
+        self.on_activity = None
+        
+        # Outgoing event buffer (see emit)
+        self._event_buffer = []
+        self._room_dirty = False  # Some buffered event wants the room snapshot
+        self._flush_pending = False
+        self._event_lock = threading.Lock()
+        
+    def emit(self, event, payload, with_room=False):
+        """
+        Queue an event for everyone in the room, coalesced into one 'batch' frame.
+        with_room=True attaches the room snapshot, serialized once at flush
+        time for the whole batch rather than once per event.
+        """
+        from app import socketio
+        with self._event_lock:
+            entry = {'event': event, 'data': payload}
+            if with_room:
+                entry['with_room'] = True
+                self._room_dirty = True
+            self._event_buffer.append(entry)
+            if len(self._event_buffer) >= BATCH_MAX_EVENTS:
+                # Full batch: send now; a pending flush picks up later events
+                events, with_room = self._take_events()
+            elif self._flush_pending:
+                return
+            else:
+                events = None
+                self._flush_pending = True
+        if events:
+            self._send_batch(socketio, events, with_room)
+        else:
+            socketio.start_background_task(self._flush_events, socketio)
+    
+    def _take_events(self):
+        """Swap out the buffer and dirty flag (caller holds _event_lock)"""
+        events, with_room = self._event_buffer, self._room_dirty
+        self._event_buffer = []
+        self._room_dirty = False
+        return events, with_room
+    
+    def _flush_events(self, socketio):
+        """Send everything buffered during the batch window as a single message"""
+        socketio.sleep(BATCH_WINDOW_SECONDS)
+        with self._event_lock:
+            events, with_room = self._take_events()
+            self._flush_pending = False
+        if events:
+            self._send_batch(socketio, events, with_room)
+    
+    def _send_batch(self, socketio, events, with_room):
+        batch = {'events': events}
+        if with_room:
+            # The client copies this into each with_room event's data.room
+            batch['room'] = room_manager._serialize_room(self)
+        socketio.emit('batch', batch, room=self.room_id)
+    
+    def _touch(self):
+        """Record activity and let the manager reschedule our expiry"""
+        self.last_activity = time.monotonic()
+        if self.on_activity:
+            self.on_activity(self)
+    
+    def expires_at(self):
+        """Monotonic time after which the room counts as expired"""
+        return self.last_activity + self.inactivity_timeout
+    
     def is_full(self):
         """Check if room has reached max players"""
         return len(self.players) >= self.max_players
@@ -66,118 +186,183 @@ class Room:
     
     def is_expired(self):
         """Check if room has exceeded inactivity timeout"""
-        return (datetime.now() - self.last_activity).total_seconds() > self.inactivity_timeout
+        return time.monotonic() - self.last_activity > self.inactivity_timeout
     
     def add_player(self, player_id, display_name, avatar_color):
-        """Add a player to the room"""
-        if self.is_full():
-            return False
-        
-        player = PlayerSlot(player_id, display_name, avatar_color)
-        self.players[player_id] = player
-        self.player_order.append(player_id)
-        self.last_activity = datetime.now()
-        return True
+        """Add a player to the room; capacity and duplicate checks are atomic"""
+        with self._lock:
+            if self._closed or self.is_full() or player_id in self.players:
+                return False
+            
+            player = PlayerSlot(player_id, display_name, avatar_color)
+            self.players[player_id] = player
+            self.player_order.append(player_id)
+            self._names.append(player.display_name)
+            self._colors.append(player.avatar_color)
+            self._scores.append(player.score)
+            self._ready.append(player.is_ready)
+            self._active.append(player.is_active)
+            self.version += 1
+            self._touch()
+            return True
     
     def remove_player(self, player_id):
         """Remove a player from the room"""
-        if player_id in self.players:
-            del self.players[player_id]
-            if player_id in self.player_order:
-                self.player_order.remove(player_id)
-            self.last_activity = datetime.now()
-            return True
-        return False
+        with self._lock:
+            if player_id in self.players:
+                del self.players[player_id]
+                if player_id in self.player_order:
+                    i = self.player_order.index(player_id)
+                    for column in (self.player_order, self._names, self._colors,
+                                   self._scores, self._ready, self._active):
+                        column.pop(i)
+                self.version += 1
+                self._touch()
+                return True
+            return False
     
     def get_player_count(self):
         """Return number of active players"""
         return len(self.players)
     
     def get_players_list(self):
-        """Return serializable list of players"""
-        return [
-            {
-                'player_id': p.player_id,
-                'display_name': p.display_name,
-                'avatar_color': p.avatar_color,
-                'score': p.score,
-                'is_ready': p.is_ready,
-                'is_active': p.is_active,
-            }
-            for p in [self.players[pid] for pid in self.player_order]
-        ]
+        """Return serializable list of players (shared between calls; don't mutate)"""
+        cached = self._players_serialized
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        with self._lock:
+            players = [
+                {
+                    'player_id': pid,
+                    'display_name': name,
+                    'avatar_color': color,
+                    'score': score,
+                    'is_ready': ready,
+                    'is_active': active,
+                }
+                for pid, name, color, score, ready, active in zip(
+                    self.player_order, self._names, self._colors,
+                    self._scores, self._ready, self._active)
+            ]
+            self._players_serialized = (self.version, players)
+        return players
     
     def start_game(self, game_type, reset_scores=False):
         """Initialize a new game session"""
-        self.current_game = GameState(game_type)
-        
-        # Initialize scores - reset if requested, otherwise use cumulative scores
-        if reset_scores:
-            for player_id in self.players:
-                self.current_game.player_scores[player_id] = 0
-        else:
-            # PRESERVE cumulative scores from previous games
-            old_scores = self.cumulative_scores.copy() if self.cumulative_scores else {}
-            for player_id in self.players:
-                self.current_game.player_scores[player_id] = old_scores.get(player_id, 0)
-        
-        # Reset ready states
-        for player in self.players.values():
-            player.is_ready = False
-        self.last_activity = datetime.now()
+        with self._lock:
+            self.current_game = GameState(game_type)
+            
+            # Initialize scores - reset if requested, otherwise use cumulative scores
+            if reset_scores:
+                for player_id in self.players:
+                    self.current_game.player_scores[player_id] = 0
+            else:
+                # PRESERVE cumulative scores from previous games
+                old_scores = self.cumulative_scores.copy() if self.cumulative_scores else {}
+                for player_id in self.players:
+                    self.current_game.player_scores[player_id] = old_scores.get(player_id, 0)
+            
+            # Reset ready states
+            for player in self.players.values():
+                player.is_ready = False
+            self._ready = [False] * len(self.player_order)
+            self.version += 1
+            self._touch()
     
     def end_game(self, results):
         """End current game, update scores, and log results"""
-        if self.current_game and results:
-            # Update scores based on result
-            if results.get('winner'):
-                # Player won
-                winner_id = results['winner']
-                if winner_id in self.current_game.player_scores:
-                    self.current_game.player_scores[winner_id] += 1
-            elif results.get('result') == 'draw':
-                # Draw - award 1 point to each player
-                for player_id in self.current_game.player_scores:
-                    self.current_game.player_scores[player_id] += 1
-            
-            # CRITICAL: Save cumulative scores before clearing current_game
-            # This allows us to preserve scores and send them to the frontend
-            self.cumulative_scores = dict(self.current_game.player_scores)
-            
-            self.current_game.results = results
-            self.game_history.append(self.current_game)
-            # NOTE: Keep current_game set until after game_ended is emitted (handled in socketio_events)
-        self.last_activity = datetime.now()
+        with self._lock:
+            if self.current_game and results:
+                # Update scores based on result
+                if results.get('winner'):
+                    # Player won
+                    winner_id = results['winner']
+                    if winner_id in self.current_game.player_scores:
+                        self.current_game.player_scores[winner_id] += 1
+                elif results.get('result') == 'draw':
+                    # Draw - award 1 point to each player
+                    for player_id in self.current_game.player_scores:
+                        self.current_game.player_scores[player_id] += 1
+                
+                # CRITICAL: Save cumulative scores before clearing current_game
+                # This allows us to preserve scores and send them to the frontend
+                self.cumulative_scores = dict(self.current_game.player_scores)
+                
+                self.current_game.results = results
+                self.game_history.append(self.current_game)
+                # Past games never change, so serialize each one once here
+                self._game_history_serialized.append({
+                    'game_type': self.current_game.game_type.value,
+                    'results': results,
+                    'started_at': self.current_game.started_at_iso,
+                })
+                # NOTE: Keep current_game set until after game_ended is emitted (handled in socketio_events)
+            self._touch()
 
 
 class RoomManager:
-    """Manages all active rooms"""
+    """
+    Manages all active rooms.
+    Socket handlers and the cleanup sweep touch rooms/player_to_room
+    concurrently, so every removal tolerates the entry already being gone.
+    Expiry is tracked in a min-heap so the sweep only visits rooms whose
+    deadline has passed.
+    _lock guards check-then-insert on self.rooms only; storage I/O always
+    runs after it is released so a slow disk/Redis call never blocks
+    other rooms.
+    """
     def __init__(self):
         self.rooms = {}  # {room_id: Room}
         self.player_to_room = {}  # {player_id: room_id} for quick lookup
         self.cleanup_interval = 60  # Run cleanup every 60 seconds
-        self.last_cleanup = datetime.now()
+        self.last_cleanup = time.monotonic()
+        self._lock = FastRLock()
+        
+        # Min-heap of (expires_at, room_id); a room may have stale entries
+        # from older activity, which are skipped when popped. Rooms push
+        # while holding their own lock, so this is a separate leaf lock
+        self._expiry_heap = []
+        self._heap_lock = threading.Lock()
+    
+    def _schedule_expiry(self, room):
+        """Push the room's current expiry time onto the heap"""
+        with self._heap_lock:
+            heapq.heappush(self._expiry_heap, (room.expires_at(), room.room_id))
+    
+    def _track(self, room):
+        """Start tracking a room's expiry once it is in self.rooms"""
+        room.on_activity = self._schedule_expiry
+        self._schedule_expiry(room)
     
-    def generate_room_id(self, length=8):
+    def restore_rooms(self, rooms):
+        """Register rooms rebuilt from storage at startup ({room_id: Room})"""
+        with self._lock:
+            self.rooms.update(rooms)
+            for room in rooms.values():
+                self._track(room)
+    
+    def generate_room_id(self, length=ROOM_ID_LENGTH):
         """Generate a secure, human-friendly room ID"""
-        chars = string.ascii_uppercase + string.digits
-        # Exclude confusing chars like 0/O, 1/I/L
-        chars = chars.replace('0', '').replace('1', '').replace('I', '').replace('O', '')
-        return ''.join(random.choice(chars) for _ in range(length))
+        # One entropy read; 32-char alphabet means each byte maps without bias
+        return ''.join(_ALPHABET[b & 31] for b in os.urandom(length))
     
     def create_room(self, inactivity_timeout_seconds=1200):
         """Create a new room and persist it"""
-        room_id = self.generate_room_id()
-        while room_id in self.rooms:  # Ensure uniqueness
+        with self._lock:
             room_id = self.generate_room_id()
+            while room_id in self.rooms:  # Ensure uniqueness
+                room_id = self.generate_room_id()
+            # One shared object for the dict key, Room.room_id and every payload
+            room_id = sys.intern(room_id)
+            
+            room = Room(room_id, inactivity_timeout_seconds=inactivity_timeout_seconds)
+            self.rooms[room_id] = room
+            self._track(room)
         
-        room = Room(room_id, inactivity_timeout_seconds=inactivity_timeout_seconds)
-        self.rooms[room_id] = room
-        
-        # Persist to storage
+        # Persist to storage outside the lock
         room_storage.add_room(room_id, {
             'room_id': room_id,
-            'created_at': room.created_at.isoformat(),
+            'created_at': room.created_at_iso,
             'max_players': room.max_players,
             'players': {},
             'status': 'active'
@@ -185,21 +370,34 @@ class RoomManager:
         
         return room_id
     
+    def _get_in_memory(self, room_id):
+        """Lock-free lookup of a live room (dict reads are atomic)"""
+        return self.rooms.get(room_id)
+    
+    def _load_from_storage(self, room_id):
+        """Build a Room from persistent storage (no lock held during I/O)"""
+        if not room_storage.get_room(room_id):
+            return None
+        return Room(room_id, inactivity_timeout_seconds=1200)
+    
     def get_room(self, room_id):
         """Retrieve a room by ID, loading from storage if needed"""
         # Check in-memory first
-        if room_id in self.rooms:
-            return self.rooms[room_id]
-        
-        # Check persistent storage
-        room_data = room_storage.get_room(room_id)
-        if room_data:
-            # Restore room from storage
-            room = Room(room_id, inactivity_timeout_seconds=1200)
-            self.rooms[room_id] = room
+        room = self._get_in_memory(room_id)
+        if room:
             return room
         
-        return None
+        # Check persistent storage outside the lock
+        loaded = self._load_from_storage(room_id)
+        if not loaded:
+            return None
+        
+        # Another caller may have restored the same room meanwhile
+        with self._lock:
+            room = self.rooms.setdefault(room_id, loaded)
+            if room is loaded:
+                self._track(room)
+        return room
     
     def join_room(self, room_id, player_id, display_name, avatar_color):
         """Add a player to a room"""
@@ -226,14 +424,22 @@ class RoomManager:
             return False
         
         room.remove_player(player_id)
-        if player_id in self.player_to_room:
-            del self.player_to_room[player_id]
+        self.player_to_room.pop(player_id, None)
         
-        # Clean up empty rooms
+        # Clean up empty rooms: re-check under both locks in case someone
+        # joined after remove_player, and close the room so a join that
+        # already holds a reference to it fails instead of landing in a
+        # room nobody can reach
         if room.is_empty():
-            del self.rooms[room_id]
-            # Also remove from persistent storage
-            room_storage.delete_room(room_id)
+            with self._lock, room._lock:
+                deleted = room.is_empty() and self.rooms.get(room_id) is room
+                if deleted:
+                    del self.rooms[room_id]
+                    room._closed = True
+            if deleted:
+                # Also remove from persistent storage and drop its chat
+                room_storage.delete_room(room_id)
+                chat_store.forget(room_id)
         
         return True
     
@@ -243,48 +449,67 @@ class RoomManager:
         if room.current_game:
             game_state = {
                 'game_type': room.current_game.game_type.value,
-                'started_at': room.current_game.started_at.isoformat(),
+                'started_at': room.current_game.started_at_iso,
                 'player_scores': room.current_game.player_scores,
                 'state_data': room.current_game.state_data,
             }
         
         return {
             'room_id': room.room_id,
-            'created_at': room.created_at.isoformat(),
+            'created_at': room.created_at_iso,
             'player_count': room.get_player_count(),
             'max_players': room.max_players,
             'players': room.get_players_list(),
             'current_game': game_state,
-            'game_history': [
-                {
-                    'game_type': g.game_type.value,
-                    'results': g.results,
-                    'started_at': g.started_at.isoformat(),
-                }
-                for g in room.game_history
-            ]
+            'game_history': list(room._game_history_serialized)
         }
     
     def cleanup_expired_rooms(self):
         """Remove expired rooms (no activity for timeout period)"""
-        now = datetime.now()
-        expired = [rid for rid, room in self.rooms.items() if room.is_expired()]
+        now = time.monotonic()
+        # Only rooms whose deadline has passed are looked at
+        due = []
+        with self._heap_lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                due.append(heapq.heappop(heap)[1])
         
-        for room_id in expired:
+        expired = []
+        with self._lock:
+            for room_id in due:
+                room = self.rooms.get(room_id)
+                if room is None:
+                    continue  # Already gone (left empty, or a duplicate entry)
+                with room._lock:
+                    if room.expires_at() > now:
+                        continue  # Touched since this entry was pushed
+                    del self.rooms[room_id]
+                    room._closed = True
+                expired.append(room)
+        
+        # Storage I/O happens after the locks are released
+        for room in expired:
             # Remove players from tracking
-            room = self.rooms[room_id]
-            for player_id in list(room.players.keys()):
-                if player_id in self.player_to_room:
-                    del self.player_to_room[player_id]
-            # Remove room
-            del self.rooms[room_id]
+            for player_id in list(room.players):
+                self.player_to_room.pop(player_id, None)
+            # Drop the persisted copy too, or the next get_room would
+            # restore the room with a fresh inactivity timer
+            room_storage.delete_room(room.room_id)
+            chat_store.forget(room.room_id)
         
         self.last_cleanup = now
         return len(expired)
     
     def maybe_cleanup(self):
         """Optionally run cleanup if interval has passed"""
-        if (datetime.now() - self.last_cleanup).total_seconds() > self.cleanup_interval:
+        if time.monotonic() - self.last_cleanup > self.cleanup_interval:
+            self.cleanup_expired_rooms()
+    
+    def cleanup_loop(self):
+        """Background task: sweep every cleanup_interval (this also drains the expiry heap)"""
+        from app import socketio
+        while True:
+            socketio.sleep(self.cleanup_interval)
             self.cleanup_expired_rooms()
     
     def get_room_info(self, room_id):
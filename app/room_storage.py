@@ -1,72 +1,138 @@
 """
-Persistent room storage using JSON file
+Persistent room storage using Redis or SQLite
 Allows rooms to survive app restarts on Render free tier
+
+When REDIS_URL is set each room lives under its own key (room:{room_id})
+with a 24h TTL, so every operation is a single round-trip. Without Redis
+rooms go to a SQLite file (WAL mode), one row per room, so each write
+touches a single indexed row instead of rewriting the whole store.
 """
 
-import json
+import orjson
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime, timedelta
-from pathlib import Path
-
-STORAGE_FILE = os.environ.get('ROOM_STORAGE_FILE', 'rooms_data.json')
-
-def load_rooms():
-    """Load rooms from persistent storage"""
-    if os.path.exists(STORAGE_FILE):
-        try:
-            with open(STORAGE_FILE, 'r') as f:
-                data = json.load(f)
-                # Clean up expired rooms
-                current_time = datetime.now().isoformat()
-                active_rooms = {}
-                for room_id, room_data in data.items():
-                    if room_data.get('expires_at', current_time) > current_time:
-                        active_rooms[room_id] = room_data
-                return active_rooms
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
-
-def save_rooms(rooms):
-    """Save rooms to persistent storage"""
-    try:
-        with open(STORAGE_FILE, 'w') as f:
-            json.dump(rooms, f, indent=2, default=str)
-    except IOError as e:
-        print(f"Error saving rooms: {e}")
+
+STORAGE_DB = os.environ.get('ROOM_STORAGE_DB', 'rooms.db')
+REDIS_URL = os.environ.get('REDIS_URL')
+ROOM_TTL_SECONDS = 24 * 60 * 60
+ROOM_KEY_PREFIX = 'room:'
+SCAN_BATCH_SIZE = 500
+
+r = None
+if REDIS_URL:
+    import redis
+    r = redis.Redis.from_url(REDIS_URL)
+
+_conn = None
+_DB_LOCK = threading.Lock()
+if r is None:
+    _conn = sqlite3.connect(STORAGE_DB, check_same_thread=False)
+    _conn.execute('PRAGMA journal_mode=WAL')
+    _conn.execute(
+        'CREATE TABLE IF NOT EXISTS rooms ('
+        'room_id TEXT PRIMARY KEY, data BLOB, expires_at INTEGER)'
+    )
+    _conn.execute('CREATE INDEX IF NOT EXISTS idx_rooms_expires_at ON rooms(expires_at)')
+    _conn.commit()
+
+def _key(room_id):
+    """Redis key for a room"""
+    return f"{ROOM_KEY_PREFIX}{room_id}"
 
 def add_room(room_id, room_data):
     """Add or update a room"""
-    rooms = load_rooms()
     # Set expiration time (24 hours from now)
-    room_data['expires_at'] = (datetime.now() + timedelta(hours=24)).isoformat()
-    rooms[room_id] = room_data
-    save_rooms(rooms)
+    room_data['expires_at'] = (datetime.now() + timedelta(seconds=ROOM_TTL_SECONDS)).isoformat()
+    payload = orjson.dumps(room_data, default=str)
+    if r is not None:
+        # Redis expires the key for us, no manual cleanup needed
+        r.set(_key(room_id), payload, ex=ROOM_TTL_SECONDS)
+        return
+
+    expires_at = int(time.time()) + ROOM_TTL_SECONDS
+    with _DB_LOCK, _conn:
+        _conn.execute(
+            'INSERT OR REPLACE INTO rooms (room_id, data, expires_at) VALUES (?, ?, ?)',
+            (room_id, payload, expires_at)
+        )
 
 def get_room(room_id):
     """Get a specific room"""
-    rooms = load_rooms()
-    return rooms.get(room_id)
+    if r is not None:
+        payload = r.get(_key(room_id))
+        return orjson.loads(payload) if payload else None
+
+    with _DB_LOCK:
+        row = _conn.execute(
+            'SELECT data FROM rooms WHERE room_id = ? AND expires_at > ?',
+            (room_id, int(time.time()))
+        ).fetchone()
+    return orjson.loads(row[0]) if row else None
 
 def delete_room(room_id):
     """Delete a room"""
-    rooms = load_rooms()
-    if room_id in rooms:
-        del rooms[room_id]
-        save_rooms(rooms)
+    if r is not None:
+        r.delete(_key(room_id))
+        return
+
+    with _DB_LOCK, _conn:
+        _conn.execute('DELETE FROM rooms WHERE room_id = ?', (room_id,))
 
 def get_all_rooms():
     """Get all active rooms"""
-    return load_rooms()
+    if r is not None:
+        rooms = {}
+        batch = []
+        for key in r.scan_iter(match=f"{ROOM_KEY_PREFIX}*", count=SCAN_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= SCAN_BATCH_SIZE:
+                _mget_into(rooms, batch)
+                batch = []
+        if batch:
+            _mget_into(rooms, batch)
+        return rooms
+
+    with _DB_LOCK:
+        rows = _conn.execute(
+            'SELECT room_id, data FROM rooms WHERE expires_at > ?',
+            (int(time.time()),)
+        ).fetchall()
+    return {room_id: orjson.loads(data) for room_id, data in rows}
+
+def iter_room_ids():
+    """Iterate IDs of active rooms without loading their data"""
+    if r is not None:
+        for key in r.scan_iter(match=f"{ROOM_KEY_PREFIX}*", count=SCAN_BATCH_SIZE):
+            yield key.decode()[len(ROOM_KEY_PREFIX):]
+        return
+
+    with _DB_LOCK:
+        rows = _conn.execute(
+            'SELECT room_id FROM rooms WHERE expires_at > ?',
+            (int(time.time()),)
+        ).fetchall()
+    for (room_id,) in rows:
+        yield room_id
+
+def _mget_into(rooms, keys):
+    """Fetch a batch of room keys with one MGET and add them to rooms"""
+    for key, payload in zip(keys, r.mget(keys)):
+        # Keys can expire between SCAN and MGET
+        if payload:
+            room_id = key.decode()[len(ROOM_KEY_PREFIX):]
+            rooms[room_id] = orjson.loads(payload)
 
 def clear_expired_rooms():
     """Remove expired rooms from storage"""
-    rooms = load_rooms()
-    current_time = datetime.now().isoformat()
-    active_rooms = {
-        room_id: room_data 
-        for room_id, room_data in rooms.items()
-        if room_data.get('expires_at', current_time) > current_time
-    }
-    save_rooms(active_rooms)
-    return len(active_rooms)
+    if r is not None:
+        # Redis TTLs already evicted anything expired
+        return len(get_all_rooms())
+
+    now = int(time.time())
+    with _DB_LOCK, _conn:
+        _conn.execute('DELETE FROM rooms WHERE expires_at <= ?', (now,))
+        (count,) = _conn.execute('SELECT COUNT(*) FROM rooms').fetchone()
+    return count
@@ -3,12 +3,30 @@ PlaySync Routes
 Web UI endpoints for landing and room pages
 """
 
-from flask import Blueprint, render_template, request, jsonify, make_response
+import orjson
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, make_response
+from markupsafe import escape
 from app.room_manager import room_manager
 from app.utils import generate_qr_code, generate_display_name, get_random_avatar_color
 
 main_bp = Blueprint('main', __name__)
 
+# Stand-in for the room ID in pre-rendered error pages
+ROOM_ID_PLACEHOLDER = '__PLAYSYNC_ROOM_ID__'
+
+def prerender_pages(app):
+    """Render pages that don't depend on request data once at startup"""
+    with app.test_request_context():
+        app.config['INDEX_HTML'] = render_template('index.html')
+        app.config['ROOM_NOT_FOUND_HTML'] = render_template(
+            'room_not_found.html', room_id=ROOM_ID_PLACEHOLDER)
+        app.config['ROOM_EXPIRED_HTML'] = render_template(
+            'room_expired.html', room_id=ROOM_ID_PLACEHOLDER)
+
+def _render_room_page(config_key, room_id):
+    """Fill the room ID into a pre-rendered page (escaped like Jinja would)"""
+    return current_app.config[config_key].replace(ROOM_ID_PLACEHOLDER, str(escape(room_id)))
+
 # Add cache control headers to prevent caching issues
 @main_bp.after_request
 def add_cache_headers(response):
@@ -22,7 +40,7 @@ def add_cache_headers(response):
 @main_bp.route('/')
 def index():
     """Landing page"""
-    return render_template('index.html')
+    return current_app.config['INDEX_HTML']
 
 @main_bp.route('/room/<room_id>')
 def room(room_id):
@@ -30,14 +48,17 @@ def room(room_id):
     room_obj = room_manager.get_room(room_id)
     
     if not room_obj:
-        return render_template('room_not_found.html', room_id=room_id), 404
+        return _render_room_page('ROOM_NOT_FOUND_HTML', room_id), 404
     
     if room_obj.is_expired():
-        return render_template('room_expired.html', room_id=room_id), 410
+        return _render_room_page('ROOM_EXPIRED_HTML', room_id), 410
     
-    # Generate QR code for this room
+    # Generate QR code for this room once per URL (host can differ on LAN)
     full_url = request.base_url  # e.g., http://localhost:5000/room/ABC123
-    qr_code_b64 = generate_qr_code(full_url)
+    if room_obj.qr_code_url != full_url:
+        room_obj.qr_code_b64 = generate_qr_code(full_url)
+        room_obj.qr_code_url = full_url
+    qr_code_b64 = room_obj.qr_code_b64
     
     return render_template(
         'room.html',
@@ -55,7 +76,7 @@ def get_room_info(room_id):
     if not room_info:
         return jsonify({'error': 'Room not found'}), 404
     
-    return jsonify(room_info)
+    return Response(orjson.dumps(room_info), mimetype='application/json')
 
 @main_bp.route('/api/create-room', methods=['POST'])
 def create_room_api():
@@ -5,9 +5,33 @@ Server-authoritative timer and round management without "best of N"
 
 import time
 import threading
+import logging
+from collections import defaultdict
 from enum import Enum
 from app import socketio
+from app import rps_scheduler
 
+logger = logging.getLogger(__name__)
+
+# Choices are coded 0/1/2 so each one beats the one before it (mod 3)
+RPS_CHOICES = ('rock', 'paper', 'scissors')
+RPS_CODE = {name: code for code, name in enumerate(RPS_CHOICES)}
+RPS_CODE.update({'r': 0, 'p': 1, 's': 2})
+
+
+def parse_choice(choice):
+    """Canonical choice name for a client-sent choice, or None if invalid"""
+    if not isinstance(choice, str):
+        return None
+    # One dict lookup for the usual lowercase name; lower() only if that misses
+    code = RPS_CODE.get(choice)
+    if code is None:
+        code = RPS_CODE.get(choice.lower())
+    return None if code is None else RPS_CHOICES[code]
+
+
+# Round outcome indexed by (player1 code - player2 code) % 3
+RPS_OUTCOME_BY_DIFF = ('draw', 'player1', 'player2')
 
 class RPSRoundState:
     """Represents a single 4-second RPS round"""
@@ -17,18 +41,30 @@ class RPSRoundState:
     
     def __init__(self):
         self.choices = {}  # {player_id: "rock"|"paper"|"scissors"|"none"}
-        self.timer_running = False
-        self.round_started_at = None
+        # (round_started_at, timer_running), replaced as a whole so readers
+        # get a consistent view from one attribute load without a lock
+        self._snapshot = (None, False)
         self.winner = None  # "player1" | "player2" | "draw" | None
         self.completed = False
+        self.player_ids = ()  # Roster snapshot taken at round start
     
-    def start(self):
-        """Start the 4-second countdown"""
-        self.timer_running = True
-        self.round_started_at = time.time()
+    @property
+    def timer_running(self):
+        return self._snapshot[1]
+    
+    @property
+    def round_started_at(self):
+        return self._snapshot[0]
+    
+    def start(self, player_ids=()):
+        """Start the 4-second countdown for the given roster"""
+        # Only the first two in join order play; player_order is a list,
+        # so slice it rather than copying the whole roster
+        self.player_ids = tuple(player_ids[:2])
         self.choices = {}
         self.winner = None
         self.completed = False
+        self._snapshot = (time.monotonic(), True)
     
     def record_choice(self, player_id, choice):
         """Record a player's choice. Can be changed during countdown."""
@@ -39,9 +75,11 @@ class RPSRoundState:
     
     def get_elapsed_time(self):
         """Get seconds elapsed since round start"""
-        if not self.round_started_at:
+        started_at = self._snapshot[0]
+        if started_at is None:
             return 0
-        return time.time() - self.round_started_at
+        # Monotonic so NTP adjustments can't shorten or stretch a round
+        return time.monotonic() - started_at
     
     def get_remaining_time(self):
         """Get seconds remaining in the round (0 if expired)"""
@@ -58,7 +96,7 @@ class RPSRoundState:
         Lock choices and compute winner.
         Called when timer expires.
         """
-        self.timer_running = False
+        self._snapshot = (self._snapshot[0], False)
         
         # Fill in "none" for players who didn't choose
         for player_id in player_ids:
@@ -78,29 +116,14 @@ class RPSRoundState:
             return None
         
         p1_id, p2_id = player_ids[0], player_ids[1]
-        p1_choice = self.choices.get(p1_id, "none")
-        p2_choice = self.choices.get(p2_id, "none")
-        
-        # If both chose nothing, it's a draw
-        if p1_choice == "none" and p2_choice == "none":
-            return "draw"
-        
-        # If one chose nothing, the other wins
-        if p1_choice == "none":
-            return "player2"
-        if p2_choice == "none":
-            return "player1"
-        
-        # Both made valid choices
-        if p1_choice == p2_choice:
-            return "draw"
-        
-        # Check what beats what
-        beats_map = {"rock": "scissors", "scissors": "paper", "paper": "rock"}
-        if beats_map.get(p1_choice) == p2_choice:
-            return "player1"
-        else:
-            return "player2"
+        # "none" (no choice before the timer ran out) has no code and loses
+        p1_code = RPS_CODE.get(self.choices.get(p1_id))
+        p2_code = RPS_CODE.get(self.choices.get(p2_id))
+        if p1_code is None or p2_code is None:
+            if p1_code is p2_code:
+                return "draw"
+            return "player2" if p1_code is None else "player1"
+        return RPS_OUTCOME_BY_DIFF[(p1_code - p2_code) % 3]
 
 
 class RockPaperScissorsManager:
@@ -110,17 +133,22 @@ class RockPaperScissorsManager:
     
     def __init__(self, room):
         self.room = room
+        self.scores = defaultdict(int)  # Only players who have won a round
         self.current_round = RPSRoundState()
-        self._timer_thread = None
+        # Only guards round transitions, which run on the shared scheduler
+        # task; choices are written lock-free
         self._lock = threading.Lock()
         self._stop_flag = False
+        self._generation = 0  # Bumped per start() to orphan old timers
         self.rounds_completed = []  # History of all completed rounds
     
     def start(self):
         """Start the first round immediately"""
         with self._lock:
             self._stop_flag = False
-            self.current_round.start()
+            # Timers left over from an earlier start() see a stale generation
+            self._generation += 1
+            self.current_round.start(self.room.player_order)
             
             # Initialize room state
             if self.room.current_game:
@@ -131,176 +159,194 @@ class RockPaperScissorsManager:
                     'winner': None
                 }
         
-        # Start server-side ticker in background
-        self._start_timer_loop()
+        # Clients count down locally from this single announcement
+        self._safe_emit(
+            'rps:round_start',
+            {
+                'round_number': len(self.rounds_completed) + 1,
+                'duration': RPSRoundState.TIMER_DURATION,
+                'scores': self.scores
+            }
+        )
+        
+        rps_scheduler.schedule(RPSRoundState.TIMER_DURATION, self._on_round_end, self._generation)
+    
+    def _is_current(self, generation):
+        """Check a scheduled timer still belongs to this running game"""
+        return not self._stop_flag and generation == self._generation
     
-    def _start_timer_loop(self):
+    def _on_round_end(self, generation):
         """
-        Background thread that:
-        1. Emits tick events every 1 second
-        2. Detects round expiry at 4 seconds
-        3. Finalizes round and starts next
+        Scheduler callback when the 4-second timer expires: finalize the
+        round, emit round_complete and schedule the next round after 1.5s
         """
-        def run():
-            last_tick = -1  # Track which second we last emitted
-            
-            while not self._stop_flag:
-                with self._lock:
-                    if not self.current_round.timer_running:
-                        time.sleep(0.1)
-                        continue
-                    
-                    remaining = self.current_round.get_remaining_time()
-                    remaining_int = int(remaining)
-                    
-                    # Emit tick if we entered a new second
-                    if remaining_int != last_tick and remaining_int > 0:
-                        last_tick = remaining_int
-                        self._emit_tick(remaining_int)
-                    
-                    # Round expired?
-                    if self.current_round.is_expired():
-                        self._finalize_and_next_round()
-                        last_tick = -1  # Reset for next round
-                
-                time.sleep(0.05)  # Check frequently for accuracy
+        with self._lock:
+            if not self._is_current(generation):
+                return
+            self._finalize_and_next_round()
         
-        self._timer_thread = threading.Thread(target=run, daemon=True)
-        self._timer_thread.start()
+        if self._is_current(generation):
+            rps_scheduler.schedule(RPSRoundState.REVEAL_DURATION, self._on_next_round, generation)
     
-    def _emit_tick(self, remaining_seconds):
-        """Emit tick event to all players"""
-        try:
-            # remaining_seconds: 4, 3, 2, 1
-            socketio.emit(
-                'rps:tick',
-                {'remaining': remaining_seconds},
-                room=self.room.room_id
-            )
-        except Exception as e:
-            print(f"[RPS] Error emitting tick: {e}")
+    def _on_next_round(self, generation):
+        """Scheduler callback after the reveal: silently start the next round"""
+        with self._lock:
+            if not self._is_current(generation):
+                return
+            self.current_round = RPSRoundState()
+            self.current_round.start(self.room.player_order)
+            
+            if self.room.current_game:
+                state = self.room.current_game.state_data
+                state['round_number'] = len(self.rounds_completed) + 1
+                state['timer_running'] = True
+                state['choices'] = self.current_round.choices
+                state['winner'] = None
+        
+        rps_scheduler.schedule(RPSRoundState.TIMER_DURATION, self._on_round_end, generation)
     
     def _finalize_and_next_round(self):
         """
         Called when timer reaches 0:
         1. Lock choices
         2. Compute winner
-        3. Emit reveal
-        4. Schedule next round after 1.5s
+        3. Emit round_complete (reveal + next round)
         """
-        # Get player order for winner mapping
-        player_ids = [p.player_id for p in self.room.players]
+        # Nobody left to play: stop the timer instead of running a dead room
+        if not self.room.players:
+            self.stop()
+            return
+        
+        # Roster captured at round start, so a mid-round leave doesn't
+        # shift who is player1/player2
+        player_ids = self.current_round.player_ids
         
         # Finalize current round
         self.current_round.finalize(player_ids)
+        reveal = None
+        if len(player_ids) < 2:
+            logger.debug("Not enough players to finalize round in room %s", self.room.room_id)
+        else:
+            reveal = self._score_round(player_ids)
+        
+        # One message per round: the client shows the reveal for
+        # REVEAL_DURATION, then starts the next countdown itself
+        self._safe_emit(
+            'rps:round_complete',
+            {
+                'reveal': reveal,
+                'next_round': {
+                    'round_number': len(self.rounds_completed) + 1,
+                    'starts_in': RPSRoundState.REVEAL_DURATION,
+                    'duration': RPSRoundState.TIMER_DURATION,
+                    'scores': self.scores
+                }
+            }
+        )
+    
+    def _score_round(self, player_ids):
+        """Record the finalized round, update scores and build the reveal"""
+        # A finalized round's choices are never written again (the next round
+        # gets a fresh RPSRoundState), so history and state_data can share them
+        choices = self.current_round.choices
         self.rounds_completed.append({
-            'choices': self.current_round.choices.copy(),
+            'choices': choices,
             'winner': self.current_round.winner
         })
         
-        # Update scores
+        # Update scores (a draw scores nothing)
         if self.current_round.winner == "player1":
-            if player_ids[0] in self.room.player_scores:
-                self.room.player_scores[player_ids[0]] += 1
+            self.scores[player_ids[0]] += 1
         elif self.current_round.winner == "player2":
-            if player_ids[1] in self.room.player_scores:
-                self.room.player_scores[player_ids[1]] += 1
+            self.scores[player_ids[1]] += 1
         
-        # Update room state BEFORE emit
+        # Update room state in place (created once in start())
         if self.room.current_game:
-            self.room.current_game.state_data = {
-                'round_number': len(self.rounds_completed),
-                'timer_running': False,
-                'choices': self.current_round.choices.copy(),
-                'winner': self.current_round.winner
-            }
+            state = self.room.current_game.state_data
+            state['round_number'] = len(self.rounds_completed)
+            state['timer_running'] = False
+            state['choices'] = choices
+            state['winner'] = self.current_round.winner
         
-        # Emit reveal
+        return {
+            'round_number': len(self.rounds_completed),
+            'p1_id': player_ids[0],
+            'p1_choice': choices.get(player_ids[0], "none"),
+            'p2_id': player_ids[1],
+            'p2_choice': choices.get(player_ids[1], "none"),
+            'winner': self.current_round.winner,
+            # Encoded during emit, before any later round touches scores
+            'scores': self.scores
+        }
+    
+    def _safe_emit(self, event, payload):
+        """Emit to the room, skipping the work entirely when nobody is in it"""
+        if not self.room.players:
+            return
         try:
-            socketio.emit(
-                'rps:reveal_result',
-                {
-                    'p1_choice': self.current_round.choices.get(player_ids[0], "none"),
-                    'p2_choice': self.current_round.choices.get(player_ids[1], "none"),
-                    'winner': self.current_round.winner,
-                    'scores': self.room.player_scores.copy()
-                },
-                room=self.room.room_id
-            )
+            socketio.emit(event, payload, room=self.room.room_id)
         except Exception as e:
-            print(f"[RPS] Error emitting reveal_result: {e}")
-        
-        # Schedule next round after 1.5 seconds
-        if not self._stop_flag:
-            self._schedule_next_round()
-    
-    def _schedule_next_round(self):
-        """Start next round after 1.5 second delay"""
-        def delayed_start():
-            time.sleep(1.5)
-            with self._lock:
-                if not self._stop_flag:
-                    self.current_round = RPSRoundState()
-                    self.current_round.start()
-                    
-                    if self.room.current_game:
-                        self.room.current_game.state_data = {
-                            'round_number': len(self.rounds_completed) + 1,
-                            'timer_running': True,
-                            'choices': {},
-                            'winner': None
-                        }
-                    
-                    # Emit new_round to reset UI
-                    try:
-                        socketio.emit(
-                            'rps:new_round',
-                            {'round_number': len(self.rounds_completed) + 1},
-                            room=self.room.room_id
-                        )
-                    except Exception as e:
-                        print(f"[RPS] Error emitting new_round: {e}")
-        
-        thread = threading.Thread(target=delayed_start, daemon=True)
-        thread.start()
+            logger.error("Error emitting %s: %s", event, e)
     
     def record_choice(self, player_id, choice):
         """
         Player submitted a choice during the 4-second window.
         Can be changed multiple times; only last one counts.
         """
-        with self._lock:
-            if not self.current_round.timer_running:
-                return {
-                    'valid': False,
-                    'message': 'Round not active'
-                }
-            
-            choice_lower = choice.lower()
-            if choice_lower not in ["rock", "paper", "scissors"]:
-                return {
-                    'valid': False,
-                    'message': 'Invalid choice. Use rock, paper, or scissors.'
-                }
-            
-            self.current_round.record_choice(player_id, choice_lower)
-            
+        # Lock-free rejection while no round is running
+        if not self.current_round.timer_running:
             return {
-                'valid': True,
-                'message': 'Choice recorded'
+                'valid': False,
+                'message': 'Round not active'
             }
+        
+        choice = parse_choice(choice)
+        if choice is None:
+            return {
+                'valid': False,
+                'message': 'Invalid choice. Use rock, paper, or scissors.'
+            }
+        
+        # No lock: the check and the single dict write in RPSRoundState are
+        # each atomic, and handlers and the round loop only switch at I/O.
+        # A choice landing within a bytecode of finalize may be dropped;
+        # that's acceptable for a 4-second round.
+        current_round = self.current_round
+        first_choice = player_id not in current_round.choices
+        recorded = current_round.record_choice(player_id, choice)
+        
+        if not recorded:
+            return {
+                'valid': False,
+                'message': 'Round not active'
+            }
+        
+        # Let the other player know a choice is in (but not which one).
+        # Changing an earlier choice isn't news, so only announce the first.
+        # Both players often choose within ms of each other, so this goes
+        # through the room's coalescing outbox
+        if first_choice:
+            self.room.emit('rps:player_ready', {'player_id': player_id, 'ready': True})
+        
+        return {
+            'valid': True,
+            'message': 'Choice recorded'
+        }
     
     def stop(self):
         """Stop the timer loop when game ends"""
-        with self._lock:
-            self._stop_flag = True
+        # Plain flag write; pending scheduler timers see it and do nothing
+        self._stop_flag = True
     
     def get_state(self):
         """Get current round state for debugging/frontend sync"""
-        with self._lock:
-            return {
-                'timer_running': self.current_round.timer_running,
-                'remaining_time': self.current_round.get_remaining_time(),
-                'choices': self.current_round.choices.copy(),
-                'rounds_completed': len(self.rounds_completed)
-            }
+        # No lock: one read of current_round, and the snapshot/dict copy are
+        # each consistent on their own
+        current_round = self.current_round
+        return {
+            'timer_running': current_round.timer_running,
+            'remaining_time': current_round.get_remaining_time(),
+            'choices': dict(current_round.choices),
+            'rounds_completed': len(self.rounds_completed),
+            'scores': dict(self.scores)
+        }
@@ -0,0 +1,54 @@
+"""
+PlaySync - Shared RPS round scheduler
+One background task drives the round timers of every RPS game instead of
+one sleeping task per room
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_heap = []  # [(deadline_monotonic, seq, callback, args)]
+_seq = itertools.count()  # Tie-breaker so callbacks are never compared
+_cond = threading.Condition()
+_task_started = False
+
+
+def schedule(delay, callback, *args):
+    """Run callback(*args) on the scheduler task after delay seconds"""
+    global _task_started
+    deadline = time.monotonic() + delay
+    with _cond:
+        heapq.heappush(_heap, (deadline, next(_seq), callback, args))
+        if not _task_started:
+            _task_started = True
+            from app import socketio
+            socketio.start_background_task(_run)
+        # Wake the task in case this deadline is earlier than the one it waits on
+        _cond.notify()
+
+
+def _run():
+    """Sleep until the earliest deadline, fire it, repeat"""
+    while True:
+        with _cond:
+            while not _heap:
+                _cond.wait()
+            delay = _heap[0][0] - time.monotonic()
+            if delay > 0:
+                _cond.wait(timeout=delay)
+                continue
+            _, _, callback, args = heapq.heappop(_heap)
+
+        # Callbacks run outside the condition so they can schedule again
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error("Error in RPS scheduler callback: %s", e)
+            # The traceback is only worth formatting when someone is debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Traceback for RPS scheduler callback", exc_info=True)
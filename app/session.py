@@ -0,0 +1,84 @@
+"""
+PlaySync - Shared Socket.IO session state
+The one copy of the socket/player table, the RPS game registry and the
+payload helpers, so every event handler module works on the same state.
+Only one handler module is registered with Socket.IO (see create_app).
+"""
+
+import threading
+from app.room_manager import GameType
+from app.striped_dict import StripedDict
+
+
+class SocketState:
+    """What a connected socket is: which player, in which room"""
+    __slots__ = ('player_id', 'room_id')
+    
+    def __init__(self, player_id, room_id=None):
+        self.player_id = player_id
+        self.room_id = room_id
+
+
+# Returned for unknown sockets so handlers can read fields without a None check
+NO_SOCKET = SocketState(None)
+
+
+class SessionTable:
+    """
+    Socket -> SocketState table plus a player -> socket index. Writers hold
+    one lock so both directions always change together (handlers and
+    disconnect timers run on different threads); lookups are one plain
+    dict read per socket.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sockets = {}  # {socket_id: SocketState}
+        self._p2s = {}  # {player_id: socket_id}
+    
+    def link(self, sid, player_id, room_id=None):
+        """Register a socket as the connection for a player (in a room)"""
+        with self._lock:
+            self._sockets[sid] = SocketState(player_id, room_id)
+            self._p2s[player_id] = sid
+    
+    def pop(self, sid):
+        """Forget a socket; returns its SocketState (or None)"""
+        with self._lock:
+            state = self._sockets.pop(sid, None)
+            # Only drop the reverse entry if the player hasn't moved to a new socket
+            if state is not None and self._p2s.get(state.player_id) == sid:
+                del self._p2s[state.player_id]
+            return state
+    
+    def unlink(self, sid):
+        """Forget a socket; returns its player_id (or None)"""
+        state = self.pop(sid)
+        return state.player_id if state is not None else None
+    
+    def state_of(self, sid):
+        """SocketState for sid; NO_SOCKET (all fields None) if it isn't linked"""
+        return self._sockets.get(sid, NO_SOCKET)
+    
+    def player_of(self, sid):
+        state = self._sockets.get(sid)
+        return state.player_id if state is not None else None
+    
+    def socket_of(self, player_id):
+        return self._p2s.get(player_id)
+
+
+# Track socket to player mapping
+session_table = SessionTable()
+
+# Running RPS games
+rps_games = StripedDict()  # {room_id: RockPaperScissorsManager}
+
+# Game type values from clients map straight to their enum members
+GAME_TYPE_BY_VALUE = {gt.value: gt for gt in GameType}
+
+
+def room_id_from(data):
+    """Room code from an event payload; codes are generated uppercase, so skip the copy"""
+    room_id = data.get('room_id', '')
+    return room_id if room_id.isupper() else room_id.upper()
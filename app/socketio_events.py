@@ -6,28 +6,45 @@ Real-time communication for rooms, players, and games
 from flask import request
 from flask_socketio import emit, join_room, leave_room, rooms as get_rooms
 from app import socketio
-from app.room_manager import room_manager, GameType
+from app.room_manager import room_manager, looks_like_room_id
+from app.chat_store import chat_store, now_ms, CHAT_MAX_LENGTH
+from app.rps_manager import parse_choice
+from app.session import session_table, rps_games, GAME_TYPE_BY_VALUE, room_id_from
 from app.game_logic import create_game_manager
 from app.utils import generate_display_name, get_random_avatar_color
-import uuid
+import secrets
+import sys
 import time
+import heapq
 import threading
+import logging
 
-# Track socket to player mapping
-socket_to_player = {}  # {socket_id: player_id}
-player_sockets = {}  # {player_id: socket_id}
-disconnect_timers = {}  # {socket_id: timer_object}
+logger = logging.getLogger(__name__)
+
+# Delayed disconnect cleanup: one reaper task drains a deadline heap
+DISCONNECT_GRACE_SECONDS = 5.0
+_pending_cleanups = []  # heap of (deadline_monotonic, socket_id)
+_cleanup_lock = threading.Lock()
+_reaper_started = False
+
+# Replies go straight to the caller's sid; flask_socketio.emit is kept for
+# room broadcasts that rely on its include_self handling
+_server = socketio.server
+
+
+def _reply(event, data):
+    """Emit an event to the requesting client only"""
+    _server.emit(event, data, to=request.sid)
 
-# Chat history (ephemeral, per room)
-chat_history = {}  # {room_id: [messages]}
 
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
-    print(f"[CONNECT] Client connected: {request.sid}")
-    emit('connect_response', {
+    sid = request.sid
+    logger.debug("Client connected: %s", sid)
+    _reply('connect_response', {
         'status': 'connected',
-        'socket_id': request.sid,
+        'socket_id': sid,
         'message': 'Connected to PlaySync'
     })
 
@@ -35,41 +52,50 @@ def handle_connect():
 def handle_disconnect():
     """Handle client disconnection with safe delayed cleanup"""
     sid = request.sid
-    player_id = socket_to_player.get(sid)
-    
-    print(f"[DISCONNECT] Client disconnected: {sid}, player_id: {player_id}")
-    
-    # Cancel any pending disconnect timer for this socket
-    if sid in disconnect_timers:
-        disconnect_timers[sid].cancel()
-        del disconnect_timers[sid]
+    logger.debug("Client disconnected: %s, player_id: %s", sid, session_table.player_of(sid))
     
     # Schedule delayed cleanup (5 seconds) to verify socket is really gone
-    def delayed_cleanup():
-        # Check if socket has reconnected
-        try:
-            # If socket reconnected, socketio.server.sockets has it
-            if sid in socketio.server.sids:
-                print(f"[DISCONNECT_CLEANUP] Socket {sid} reconnected, keeping player {player_id}")
-                return
-        except:
-            pass
-        
-        # Socket is really gone, cleanup
-        if sid in socket_to_player:
-            player_id_to_remove = socket_to_player.pop(sid)
-            if player_id_to_remove in player_sockets:
-                del player_sockets[player_id_to_remove]
-            print(f"[DISCONNECT_CLEANUP] Cleaned up player {player_id_to_remove} after delayed verification")
-        
-        if sid in disconnect_timers:
-            del disconnect_timers[sid]
-    
-    # Start 5-second delayed cleanup
-    timer = threading.Timer(5.0, delayed_cleanup)
-    disconnect_timers[sid] = timer
-    timer.daemon = True
-    timer.start()
+    _schedule_cleanup(sid)
+
+
+def _schedule_cleanup(sid):
+    """Queue a socket for cleanup after the grace period"""
+    global _reaper_started
+    with _cleanup_lock:
+        heapq.heappush(_pending_cleanups, (time.monotonic() + DISCONNECT_GRACE_SECONDS, sid))
+        if not _reaper_started:
+            _reaper_started = True
+            socketio.start_background_task(_cleanup_reaper)
+
+
+def _cleanup_reaper():
+    """Background task: once a second, clean up sockets whose grace period ended"""
+    while True:
+        socketio.sleep(1.0)
+        now = time.monotonic()
+        due = []
+        with _cleanup_lock:
+            while _pending_cleanups and _pending_cleanups[0][0] <= now:
+                due.append(heapq.heappop(_pending_cleanups)[1])
+        for sid in due:
+            _delayed_cleanup(sid)
+
+
+def _delayed_cleanup(sid):
+    """Drop a disconnected socket's player mapping unless it came back"""
+    # Check if socket has reconnected
+    try:
+        # If socket reconnected, socketio.server.sockets has it
+        if sid in socketio.server.sids:
+            logger.debug("Socket %s reconnected, keeping player %s", sid, session_table.player_of(sid))
+            return
+    except Exception:
+        pass
+    
+    # Socket is really gone, cleanup
+    player_id_to_remove = session_table.unlink(sid)
+    if player_id_to_remove is not None:
+        logger.debug("Cleaned up player %s after delayed verification", player_id_to_remove)
 
 
 @socketio.on('join_room_request')
@@ -79,72 +105,68 @@ def handle_join_room(data):
     Expected data: {'room_id': str}
     Optionally: {'display_name': str, 'avatar_color': str}
     """
-    room_id = data.get('room_id', '').upper()
+    room_id = room_id_from(data)
     
     # Validate room
     room_obj = room_manager.get_room(room_id)
     if not room_obj:
-        emit('join_room_response', {
+        _reply('join_room_response', {
             'success': False,
             'error': 'Room not found'
         })
         return
     
     if room_obj.is_expired():
-        emit('join_room_response', {
+        _reply('join_room_response', {
             'success': False,
             'error': 'Room has expired'
         })
         return
     
     if room_obj.is_full():
-        emit('join_room_response', {
+        _reply('join_room_response', {
             'success': False,
             'error': 'Room is full'
         })
         return
     
     # Generate player identity
-    player_id = str(uuid.uuid4())
+    player_id = secrets.token_urlsafe(12)  # 96 random bits, 16 URL-safe chars
+    # Interned so the session table, room and roster share one object and
+    # its cached hash; lookups with the same object match by identity
+    player_id = sys.intern(player_id)
     display_name = data.get('display_name') or generate_display_name()
     avatar_color = data.get('avatar_color') or get_random_avatar_color()
     
     # Add to room
     result = room_manager.join_room(room_id, player_id, display_name, avatar_color)
     if not result['success']:
-        emit('join_room_response', {
+        _reply('join_room_response', {
             'success': False,
             'error': result.get('error', 'Could not join room')
         })
         return
     
     # Register socket-player mapping
-    socket_to_player[request.sid] = player_id
-    player_sockets[player_id] = request.sid
+    session_table.link(request.sid, player_id, room_id)
     
     # Join Socket.IO room
     join_room(room_id)
     
-    # Send success response with room state
-    emit('join_room_response', {
-        'success': True,
+    # Both events carry the same player/room payload
+    joined = {
         'player_id': player_id,
         'display_name': display_name,
         'avatar_color': avatar_color,
         'room': result['room']
-    })
+    }
     
-    # Broadcast player joined to all in room
-    emit('player_joined', {
-        'player_id': player_id,
-        'display_name': display_name,
-        'avatar_color': avatar_color,
-        'room': result['room']
-    }, room=room_id)
+    # Send success response with room state
+    _reply('join_room_response', {'success': True, **joined})
     
-    # Initialize chat history if needed
-    if room_id not in chat_history:
-        chat_history[room_id] = []
+    # Broadcast player joined to everyone else; the joiner already has
+    # this state from join_room_response
+    emit('player_joined', joined, room=room_id, include_self=False)
 
 @socketio.on('leave_room_request')
 def handle_leave_room(data):
@@ -152,14 +174,15 @@ def handle_leave_room(data):
     Leave a room
     Expected data: {'room_id': str, 'player_id': str}
     """
-    room_id = data.get('room_id', '').upper()
+    sid = request.sid
+    room_id = room_id_from(data)
     player_id = data.get('player_id')
     
-    player_id_mapped = socket_to_player.get(request.sid)
+    player_id_mapped = session_table.player_of(sid)
     
     # Validate player identity
     if player_id != player_id_mapped:
-        emit('leave_room_response', {
+        _reply('leave_room_response', {
             'success': False,
             'error': 'Player ID mismatch'
         })
@@ -168,23 +191,18 @@ def handle_leave_room(data):
     room_manager.leave_room(room_id, player_id)
     
     # Clean up mappings
-    if request.sid in socket_to_player:
-        del socket_to_player[request.sid]
-    if player_id in player_sockets:
-        del player_sockets[player_id]
+    session_table.unlink(sid)
     
     # Leave Socket.IO room
     leave_room(room_id)
     
-    emit('leave_room_response', {'success': True})
+    _reply('leave_room_response', {'success': True})
     
-    # Notify others
+    # Notify others; the room snapshot is built once when the batch flushes,
+    # so a burst of departures serializes the room only once
     room_obj = room_manager.get_room(room_id)
     if room_obj:
-        emit('player_left', {
-            'player_id': player_id,
-            'room': room_manager.get_room_info(room_id)
-        }, room=room_id)
+        room_obj.emit('player_left', {'player_id': player_id}, with_room=True)
 
 @socketio.on('start_game_request')
 def handle_start_game(data):
@@ -192,53 +210,44 @@ def handle_start_game(data):
     Start a new game in a room
     Expected data: {'room_id': str, 'game_type': str, 'reset_scores': bool (optional)}
     """
-    print(f"[START_GAME] Received start_game_request: {data}")
-    room_id = data.get('room_id', '').upper()
+    logger.debug("START_GAME received start_game_request: %s", data)
+    room_id = room_id_from(data)
     game_type = data.get('game_type', '').lower()
     reset_scores = data.get('reset_scores', False)  # Default to False for rematch
-    player_id = socket_to_player.get(request.sid)
-    print(f"[START_GAME] room_id={room_id}, game_type={game_type}, reset_scores={reset_scores}, player_id={player_id}")
+    player_id = session_table.player_of(request.sid)
+    logger.debug("START_GAME room_id=%s, game_type=%s, reset_scores=%s, player_id=%s",
+                 room_id, game_type, reset_scores, player_id)
     
     room_obj = room_manager.get_room(room_id)
-    print(f"[START_GAME] room_obj found: {room_obj is not None}")
     if not room_obj:
-        print(f"[START_GAME] Room not found: {room_id}")
-        emit('start_game_response', {
+        logger.debug("START_GAME room not found: %s", room_id)
+        _reply('start_game_response', {
             'success': False,
             'error': 'Room not found'
         })
         return
     
     if player_id not in room_obj.players:
-        print(f"[START_GAME] Player {player_id} not in room {room_id}")
-        emit('start_game_response', {
+        logger.debug("START_GAME player %s not in room %s", player_id, room_id)
+        _reply('start_game_response', {
             'success': False,
             'error': 'Not a member of this room'
         })
         return
     
     if room_obj.get_player_count() < 2:
-        print(f"[START_GAME] Not enough players: {room_obj.get_player_count()}")
-        emit('start_game_response', {
+        logger.debug("START_GAME not enough players: %s", room_obj.get_player_count())
+        _reply('start_game_response', {
             'success': False,
             'error': 'Need at least 2 players to start'
         })
         return
     
     # Start game
-    try:
-        # Convert game_type string to GameType enum by matching against .value
-        game_type_enum = None
-        for gt in GameType:
-            if gt.value == game_type:
-                game_type_enum = gt
-                break
-        if not game_type_enum:
-            raise KeyError(f"No GameType with value '{game_type}'")
-        print(f"[START_GAME] game_type_enum: {game_type_enum}")
-    except KeyError as e:
-        print(f"[START_GAME] Invalid game type: {game_type} - {e}")
-        emit('start_game_response', {
+    game_type_enum = GAME_TYPE_BY_VALUE.get(game_type)
+    if game_type_enum is None:
+        logger.debug("START_GAME invalid game type: %s", game_type)
+        _reply('start_game_response', {
             'success': False,
             'error': f'Unknown game type: {game_type}'
         })
@@ -248,10 +257,9 @@ def handle_start_game(data):
     
     # Create game manager
     game_mgr = create_game_manager(game_type_enum, room_obj)
-    print(f"[START_GAME] game_mgr created: {game_mgr is not None}")
     if not game_mgr:
-        print(f"[START_GAME] Failed to create game manager for {game_type_enum}")
-        emit('start_game_response', {
+        logger.error("START_GAME failed to create game manager for %s", game_type_enum)
+        _reply('start_game_response', {
             'success': False,
             'error': 'Game manager not available'
         })
@@ -261,18 +269,15 @@ def handle_start_game(data):
     room_obj._game_manager = game_mgr
     
     game_mgr.start()
-    print(f"[START_GAME] Game manager started")
     
-    emit('start_game_response', {'success': True})
-    print(f"[START_GAME] Emitted start_game_response success")
+    _reply('start_game_response', {'success': True})
     
     # Broadcast game started
-    print(f"[START_GAME] Emitting game_started to room {room_id}")
+    logger.debug("START_GAME %s started in room %s", game_type_enum.value, room_id)
     emit('game_started', {
         'game_type': game_type_enum.value,
         'room': room_manager.get_room_info(room_id)
     }, room=room_id)
-    print(f"[START_GAME] Emitted game_started")
 
 @socketio.on('game_move')
 def handle_game_move(data):
@@ -280,59 +285,63 @@ def handle_game_move(data):
     Submit a game move
     Expected data: {'room_id': str, 'move': <game_specific>}
     """
-    room_id = data.get('room_id', '').upper()
-    player_id = socket_to_player.get(request.sid)
+    room_id = room_id_from(data)
+    player_id = session_table.player_of(request.sid)
     
     room_obj = room_manager.get_room(room_id)
     if not room_obj or not room_obj.current_game:
-        emit('game_move_response', {
+        _reply('game_move_response', {
             'success': False,
             'error': 'No active game'
         })
         return
     
-    if not hasattr(room_obj, '_game_manager'):
-        emit('game_move_response', {
+    game_mgr = room_obj._game_manager
+    if game_mgr is None:
+        _reply('game_move_response', {
             'success': False,
             'error': 'Game manager not ready'
         })
         return
     
-    game_mgr = room_obj._game_manager
     move_data = data.get('move', {})
     
     # Process move with game manager
     result = game_mgr.process_move(player_id, move_data)
     
-    emit('game_move_response', {
-        'success': result.get('valid', False),
-        'message': result.get('message', ''),
-        'data': {k: v for k, v in result.items() if k not in ['valid', 'message']}
+    _reply('game_move_response', {
+        'success': result.valid,
+        'message': result.message,
+        'data': result.data
     })
     
     # Send success response to current player
     # NOTE: We already emitted a response above; avoid duplicating.
     
-    # Broadcast move to ALL players in room (including self)
-    emit('move_made', {
-        'player_id': player_id,
-        'room': room_manager.get_room_info(room_id)
-    }, room=room_id, include_self=True)
-    
-    # Check if game is complete
-    if game_mgr.is_game_complete():
-        print(f"[GAME_END] Game complete for room {room_id}")
+    # Check if game is complete (before serializing, so both broadcasts
+    # below can share one snapshot of the final state)
+    game_complete = game_mgr.is_game_complete()
+    if game_complete:
+        logger.debug("GAME_END game complete for room %s", room_id)
         game_results = game_mgr.get_results()
         room_obj.end_game(game_results)
-        print(f"[GAME_END] Results: {game_results}")
-        
-        # Broadcast game ended to ALL players (with current_game still set so scores serialize correctly)
-        emit('game_ended', {
-            'results': game_results,
-            'room': room_manager.get_room_info(room_id)
-        }, room=room_id, include_self=True)
-        
-        # NOW clear current_game after emission
+        logger.debug("GAME_END results: %s", game_results)
+    
+    room_info = room_manager.get_room_info(room_id)
+    
+    # One packet to ALL players in room (including self); the client
+    # unpacks it into move_made and, on the last move, game_ended
+    update = {
+        'player_id': player_id,
+        'room': room_info
+    }
+    if game_complete:
+        update['game_ended'] = {'results': game_results}
+    emit('game_update', update, room=room_id, include_self=True)
+    
+    if game_complete:
+        # Clear current_game only after room_info was serialized with it,
+        # so the final scores go out correctly
         room_obj.current_game = None
 
 @socketio.on('reaction_ready')
@@ -340,19 +349,17 @@ def handle_reaction_ready(data):
     """
     Signal that player is ready for reaction time game
     """
-    room_id = data.get('room_id', '').upper()
-    player_id = socket_to_player.get(request.sid)
+    room_id = room_id_from(data)
+    player_id = session_table.player_of(request.sid)
     
     room_obj = room_manager.get_room(room_id)
     if not room_obj or not room_obj.current_game:
         return
     
-    if hasattr(room_obj, '_game_manager'):
-        game_mgr = room_obj._game_manager
-        
+    game_mgr = room_obj._game_manager
+    if game_mgr is not None:
         # Mark player as ready
-        if hasattr(game_mgr, 'set_ready'):
-            game_mgr.set_ready()
+        game_mgr.set_ready()
 
 @socketio.on('chat_message')
 def handle_chat_message(data):
@@ -360,10 +367,16 @@ def handle_chat_message(data):
     Send a chat message in a room
     Expected data: {'room_id': str, 'message': str}
     """
-    room_id = data.get('room_id', '').upper()
-    player_id = socket_to_player.get(request.sid)
+    # Reject bad payloads before touching any room state
     message = data.get('message', '').strip()
+    if not 0 < len(message) <= CHAT_MAX_LENGTH:
+        return
+    
+    room_id = room_id_from(data)
+    if not looks_like_room_id(room_id):
+        return
     
+    player_id = session_table.player_of(request.sid)
     room_obj = room_manager.get_room(room_id)
     if not room_obj:
         return
@@ -371,29 +384,24 @@ def handle_chat_message(data):
     if player_id not in room_obj.players:
         return
     
-    if not message or len(message) > 200:
-        return
-    
-    # Initialize chat history if needed
-    if room_id not in chat_history:
-        chat_history[room_id] = []
-    
     player = room_obj.players[player_id]
     chat_entry = {
         'player_id': player_id,
         'display_name': player.display_name,
         'avatar_color': player.avatar_color,
         'message': message,
-        'timestamp': time.time()
+        'ts_ms': now_ms()
     }
     
-    # Keep only last 50 messages per room
-    chat_history[room_id].append(chat_entry)
-    if len(chat_history[room_id]) > 50:
-        chat_history[room_id].pop(0)
+    # The store trims each room back to its last 50 messages
+    chat_store.append(room_id, chat_entry)
     
-    # Broadcast message
-    emit('chat_message', chat_entry, room=room_id)
+    # Broadcast message (coalesced with other room events in the same
+    # window); a lone player only needs their own echo
+    if room_obj.get_player_count() > 1:
+        room_obj.emit('chat_message', chat_entry)
+    else:
+        _reply('chat_message', chat_entry)
 
 @socketio.on('rematch_request')
 def handle_rematch(data):
@@ -401,8 +409,8 @@ def handle_rematch(data):
     Request a rematch
     Expected data: {'room_id': str}
     """
-    room_id = data.get('room_id', '').upper()
-    player_id = socket_to_player.get(request.sid)
+    room_id = room_id_from(data)
+    player_id = session_table.player_of(request.sid)
     
     room_obj = room_manager.get_room(room_id)
     if not room_obj:
@@ -423,8 +431,8 @@ def handle_switch_game(data):
     Request to switch to a different game
     Expected data: {'room_id': str}
     """
-    room_id = data.get('room_id', '').upper()
-    player_id = socket_to_player.get(request.sid)
+    room_id = room_id_from(data)
+    player_id = session_table.player_of(request.sid)
     
     room_obj = room_manager.get_room(room_id)
     if not room_obj:
@@ -432,8 +440,7 @@ def handle_switch_game(data):
     
     # Reset game state
     room_obj.current_game = None
-    if hasattr(room_obj, '_game_manager'):
-        delattr(room_obj, '_game_manager')
+    room_obj._game_manager = None
     
     # Broadcast game switched
     emit('game_switched', {
@@ -445,11 +452,10 @@ def handle_get_chat_history(data):
     """
     Request chat history for a room
     """
-    room_id = data.get('room_id', '').upper()
+    room_id = room_id_from(data)
     
-    history = chat_history.get(room_id, [])
-    emit('chat_history', {
-        'messages': history
+    _reply('chat_history', {
+        'messages': chat_store.recent(room_id)
     })
 
 # Periodic cleanup (can be run by background task or called manually)
@@ -462,85 +468,87 @@ def cleanup_rooms():
 # RPS TIMER-BASED GAME HANDLERS
 # ============================================================================
 
-# Track RPS timer games
-rps_timers = {}  # {room_id: RPSTimerManager}
-
 @socketio.on('rps_start')
 def handle_rps_start(data):
     """Start a new RPS timer-based game"""
-    room_id = data.get('room_id', '').upper()
-    player_id = socket_to_player.get(request.sid)
+    room_id = room_id_from(data)
+    player_id = session_table.player_of(request.sid)
     
-    print(f"[RPS_START] Received RPS start request for room {room_id}, player {player_id}")
+    logger.debug("RPS start requested for room %s by player %s", room_id, player_id)
     
     room_obj = room_manager.get_room(room_id)
     if not room_obj:
-        print(f"[RPS_START] Room not found: {room_id}")
-        emit('rps_start_response', {'success': False, 'error': 'Room not found'})
+        logger.debug("RPS start: room not found: %s", room_id)
+        _reply('rps_start_response', {'success': False, 'error': 'Room not found'})
         return
     
     if player_id not in room_obj.players:
-        print(f"[RPS_START] Player not in room")
-        emit('rps_start_response', {'success': False, 'error': 'Not a member of this room'})
+        logger.debug("RPS start: player %s not in room %s", player_id, room_id)
+        _reply('rps_start_response', {'success': False, 'error': 'Not a member of this room'})
         return
     
     if len(room_obj.players) < 2:
-        print(f"[RPS_START] Not enough players: {len(room_obj.players)}")
-        emit('rps_start_response', {'success': False, 'error': 'Need 2 players'})
+        logger.debug("RPS start: not enough players in room %s", room_id)
+        _reply('rps_start_response', {'success': False, 'error': 'Need 2 players'})
         return
     
-    # Stop any existing RPS timer
-    if room_id in rps_timers:
-        old_timer = rps_timers[room_id]
+    # Start new RPS timer, stopping any existing one it replaces
+    from app.rps_manager import RockPaperScissorsManager
+    timer = RockPaperScissorsManager(room_obj)
+    old_timer = rps_games.swap(room_id, timer)
+    if old_timer is not None:
         old_timer.stop()
-        del rps_timers[room_id]
-    
-    # Start new RPS timer
-    from app.rps_timer import RPSTimerManager
-    timer = RPSTimerManager(room_obj, socketio, room_id)
-    rps_timers[room_id] = timer
     timer.start()
     
-    print(f"[RPS_START] RPS timer started for room {room_id}")
-    emit('rps_start_response', {'success': True})
+    logger.debug("RPS timer started for room %s", room_id)
+    _reply('rps_start_response', {'success': True})
 
 
 @socketio.on('rps_choice')
 def handle_rps_choice(data):
     """Submit a choice for RPS timer game"""
-    room_id = data.get('room_id', '').upper()
+    room_id = room_id_from(data)
     choice = data.get('choice', '')
-    player_id = socket_to_player.get(request.sid)
+    player_id = session_table.player_of(request.sid)
     
-    print(f"[RPS_CHOICE] Player {player_id} chose {choice} in room {room_id}")
+    logger.debug("RPS choice from player %s in room %s: %s", player_id, room_id, choice)
+    
+    # Reject bad payloads before touching the game registry; from here on
+    # choice is the canonical name that gets recorded
+    choice = parse_choice(choice)
+    if choice is None:
+        _reply('rps_choice_response', {'success': False, 'error': 'Invalid choice. Use rock, paper, or scissors.'})
+        return
+    if not looks_like_room_id(room_id):
+        _reply('rps_choice_response', {'success': False, 'error': 'Game not started'})
+        return
     
-    if room_id not in rps_timers:
-        print(f"[RPS_CHOICE] No RPS game in room {room_id}")
-        emit('rps_choice_response', {'success': False, 'error': 'Game not started'})
+    timer_game = rps_games.get(room_id)
+    if timer_game is None:
+        logger.debug("RPS choice: no game in room %s", room_id)
+        _reply('rps_choice_response', {'success': False, 'error': 'Game not started'})
         return
     
-    timer_game = rps_timers[room_id]
-    result = timer_game.submit_choice(player_id, choice)
+    result = timer_game.record_choice(player_id, choice)
     
-    if result['success']:
-        emit('rps_choice_response', {'success': True, 'choice': choice})
+    if result['valid']:
+        _reply('rps_choice_response', {'success': True, 'choice': choice})
     else:
-        emit('rps_choice_response', {'success': False, 'error': result.get('error')})
+        _reply('rps_choice_response', {'success': False, 'error': result['message']})
 
 
 @socketio.on('rps_stop')
 def handle_rps_stop(data):
     """Stop RPS game"""
-    room_id = data.get('room_id', '').upper()
-    player_id = socket_to_player.get(request.sid)
+    room_id = room_id_from(data)
+    player_id = session_table.player_of(request.sid)
     
-    if room_id not in rps_timers:
+    timer_game = rps_games.pop(room_id)
+    if timer_game is None:
         return
     
-    timer_game = rps_timers[room_id]
     timer_game.stop()
-    del rps_timers[room_id]
     
-    print(f"[RPS_STOP] RPS game stopped for room {room_id}")
+    logger.debug("RPS game stopped for room %s", room_id)
     emit('rps_stopped', {'room_id': room_id}, room=room_id)
 
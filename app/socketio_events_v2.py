@@ -14,72 +14,113 @@ from flask import request
 from flask_socketio import emit, join_room, leave_room, rooms as get_rooms
 from app import socketio
 from app.room_manager import room_manager, GameType
+from app.chat_store import chat_store, now_ms
+from app.session import session_table
 from app.game_logic import create_game_manager
 from app.utils import generate_display_name, get_random_avatar_color
-import uuid
+import secrets
+import sys
 import time
+import heapq
+import threading
 import logging
-import traceback
 
-# Configure logging
+# Level comes from the root logger (LOG_LEVEL, see run.py)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-# Track socket to player mapping
-socket_to_player = {}  # {socket_id: player_id}
-player_sockets = {}  # {player_id: socket_id}
-socket_to_room = {}   # {socket_id: room_id} for tracking
 
-# Chat history (ephemeral, per room)
-chat_history = {}  # {room_id: [messages]}
+def _log_exc(handler, exc):
+    """Log a handler error; the (slow) traceback only when debugging"""
+    logger.error("Error in %s: %s", handler, exc)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Traceback for %s", handler, exc_info=True)
+
+# Accepted RPS choices; one hash probe per move, nothing allocated
+_VALID_RPS = frozenset(('rock', 'paper', 'scissors'))
+
+# Game type names from clients (e.g. "tic_tac_toe") map straight to their enum members
+_GAME_TYPE_BY_NAME = {gt.name.lower(): gt for gt in GameType}
+
+# Constant RPS status payloads, built once instead of on every move
+_NEW_ROUND_PAYLOAD = {'message': 'Next round starting...'}
+_WAITING_PAYLOAD = {'message': 'Waiting for opponent...'}
 
 # Ephemeral token for reconnect grace period (socket_id -> token, timestamp)
 reconnect_tokens = {}  # {socket_id: (ephemeral_token, timestamp, room_id, player_id)}
 
+# Tokens expire after the grace period; a min-heap of deadlines lets the
+# reaper pop only what's due instead of scanning every token
+RECONNECT_GRACE_SECONDS = 30
+_token_expiry = []  # heap of (deadline_monotonic, socket_id, token)
+_token_lock = threading.Lock()
+_token_reaper_started = False
+
+
+def _issue_reconnect_token(sid, room_id, player_id):
+    """Store a reconnect token for sid and schedule its expiry"""
+    global _token_reaper_started
+    token = secrets.token_urlsafe(12)
+    with _token_lock:
+        reconnect_tokens[sid] = (token, time.time(), room_id, player_id)
+        heapq.heappush(_token_expiry, (time.monotonic() + RECONNECT_GRACE_SECONDS, sid, token))
+        if not _token_reaper_started:
+            _token_reaper_started = True
+            socketio.start_background_task(_expire_reconnect_tokens)
+    return token
+
+
+def _expire_reconnect_tokens():
+    """Background task: drop reconnect tokens whose grace period is over"""
+    while True:
+        socketio.sleep(5)
+        now = time.monotonic()
+        with _token_lock:
+            while _token_expiry and _token_expiry[0][0] <= now:
+                _, sid, token = heapq.heappop(_token_expiry)
+                # Skip if the token was already claimed or replaced
+                entry = reconnect_tokens.get(sid)
+                if entry is not None and entry[0] == token:
+                    del reconnect_tokens[sid]
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
     try:
-        logger.info(f"Client connected: socket_id={request.sid}")
+        sid = request.sid
+        logger.info(f"Client connected: socket_id={sid}")
         emit('connect_response', {
             'status': 'connected',
-            'socket_id': request.sid,
+            'socket_id': sid,
             'message': 'Connected to PlaySync'
         })
     except Exception as e:
-        logger.error(f"Error in handle_connect: {e}", exc_info=True)
+        _log_exc('handle_connect', e)
         emit('error', {'message': 'Connection error'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection - cleanup and prepare for reconnect grace period"""
     try:
-        player_id = socket_to_player.pop(request.sid, None)
-        room_id = socket_to_room.pop(request.sid, None)
+        sid = request.sid
+        state = session_table.pop(sid)
+        player_id, room_id = (state.player_id, state.room_id) if state else (None, None)
         
         if player_id:
-            logger.info(f"Client disconnected: socket_id={request.sid}, player_id={player_id}, room_id={room_id}")
+            logger.info(f"Client disconnected: socket_id={sid}, player_id={player_id}, room_id={room_id}")
             
             # Generate ephemeral token for reconnect grace period (30 seconds)
-            token = str(uuid.uuid4())
-            reconnect_tokens[request.sid] = (token, time.time(), room_id, player_id)
-            
-            # Clean up player socket mapping
-            if player_id in player_sockets:
-                del player_sockets[player_id]
+            _issue_reconnect_token(sid, room_id, player_id)
             
             # Broadcast player left to room
             if room_id:
                 room_obj = room_manager.get_room(room_id)
                 if room_obj:
-                    emit('player_left', {
-                        'player_id': player_id,
-                        'room': room_manager._serialize_room(room_obj)
-                    }, room=room_id)
+                    # Snapshot built once per batch flush, not per disconnect
+                    room_obj.emit('player_left', {'player_id': player_id}, with_room=True)
         else:
-            logger.debug(f"Client disconnected without join: socket_id={request.sid}")
+            logger.debug(f"Client disconnected without join: socket_id={sid}")
     except Exception as e:
-        logger.error(f"Error in handle_disconnect: {e}", exc_info=True)
+        _log_exc('handle_disconnect', e)
 
 @socketio.on('join_room_request')
 def handle_join_room(data):
@@ -88,15 +129,16 @@ def handle_join_room(data):
     Expected data: {'room_id': str, 'display_name': str, 'avatar_color': str}
     """
     try:
+        sid = request.sid
         room_id = (data.get('room_id', '') or '').upper()
         display_name = data.get('display_name') or generate_display_name()
         avatar_color = data.get('avatar_color') or get_random_avatar_color()
         
-        logger.info(f"Join request: room_id={room_id}, socket_id={request.sid}, player_name={display_name}")
+        logger.info(f"Join request: room_id={room_id}, socket_id={sid}, player_name={display_name}")
         
         # Prevent duplicate joins from same socket
-        if request.sid in socket_to_player:
-            logger.warning(f"Duplicate join attempt from socket_id={request.sid}")
+        if session_table.player_of(sid) is not None:
+            logger.warning(f"Duplicate join attempt from socket_id={sid}")
             emit('join_room_response', {
                 'success': False,
                 'error': 'Already joined a room'
@@ -132,7 +174,9 @@ def handle_join_room(data):
             return
         
         # Generate player identity
-        player_id = str(uuid.uuid4())
+        player_id = secrets.token_urlsafe(12)  # 96 random bits, 16 URL-safe chars
+        # Interned so the session table, room and roster share one object
+        player_id = sys.intern(player_id)
         
         # Add to room (atomically)
         result = room_manager.join_room(room_id, player_id, display_name, avatar_color)
@@ -145,34 +189,29 @@ def handle_join_room(data):
             return
         
         # Register socket-player mapping (NO DUPLICATES)
-        socket_to_player[request.sid] = player_id
-        socket_to_room[request.sid] = room_id
-        player_sockets[player_id] = request.sid
+        session_table.link(sid, player_id, room_id)
         
         # Join Socket.IO room
         join_room(room_id)
         
-        logger.info(f"Join successful: room_id={room_id}, player_id={player_id}, socket_id={request.sid}")
+        logger.info(f"Join successful: room_id={room_id}, player_id={player_id}, socket_id={sid}")
         
-        # Send success response with room state
-        emit('join_room_response', {
-            'success': True,
+        # Both events carry the same player/room payload
+        joined = {
             'player_id': player_id,
             'display_name': display_name,
             'avatar_color': avatar_color,
             'room': result['room']
-        })
+        }
+        
+        # Send success response with room state
+        emit('join_room_response', {'success': True, **joined})
         
         # Broadcast to other players in room
-        emit('player_joined', {
-            'player_id': player_id,
-            'display_name': display_name,
-            'avatar_color': avatar_color,
-            'room': result['room']
-        }, room=room_id, skip_sid=request.sid)
+        emit('player_joined', joined, room=room_id, skip_sid=sid)
         
     except Exception as e:
-        logger.error(f"Error in handle_join_room: {e}", exc_info=True)
+        _log_exc('handle_join_room', e)
         emit('join_room_response', {
             'success': False,
             'error': 'Internal server error'
@@ -182,11 +221,12 @@ def handle_join_room(data):
 def handle_leave_room(data):
     """Leave the current room"""
     try:
-        player_id = socket_to_player.get(request.sid)
-        room_id = socket_to_room.get(request.sid)
+        sid = request.sid
+        state = session_table.state_of(sid)
+        player_id, room_id = state.player_id, state.room_id
         
         if not player_id or not room_id:
-            logger.warning(f"Leave request from socket not in room: socket_id={request.sid}")
+            logger.warning(f"Leave request from socket not in room: socket_id={sid}")
             return
         
         logger.info(f"Leave request: room_id={room_id}, player_id={player_id}")
@@ -195,9 +235,7 @@ def handle_leave_room(data):
         room_manager.leave_room(room_id, player_id)
         
         # Cleanup mappings
-        socket_to_player.pop(request.sid, None)
-        socket_to_room.pop(request.sid, None)
-        player_sockets.pop(player_id, None)
+        session_table.unlink(sid)
         
         # Leave Socket.IO room
         leave_room(room_id)
@@ -205,37 +243,34 @@ def handle_leave_room(data):
         # Broadcast to remaining players
         room_obj = room_manager.get_room(room_id)
         if room_obj:
-            emit('player_left', {
-                'player_id': player_id,
-                'room': room_manager._serialize_room(room_obj)
-            }, room=room_id)
+            room_obj.emit('player_left', {'player_id': player_id}, with_room=True)
         
         logger.info(f"Leave successful: room_id={room_id}, player_id={player_id}")
         
     except Exception as e:
-        logger.error(f"Error in handle_leave_room: {e}", exc_info=True)
+        _log_exc('handle_leave_room', e)
         emit('error', {'message': 'Error leaving room'})
 
 @socketio.on('start_game_request')
 def handle_start_game(data):
     """Start a new game in the room"""
     try:
-        player_id = socket_to_player.get(request.sid)
-        room_id = socket_to_room.get(request.sid)
+        sid = request.sid
+        state = session_table.state_of(sid)
+        player_id, room_id = state.player_id, state.room_id
         game_type = data.get('game_type', '').lower()
         reset_scores = data.get('reset_scores', False)
         
         if not player_id or not room_id:
-            logger.warning(f"Start game request from socket not in room: socket_id={request.sid}")
+            logger.warning(f"Start game request from socket not in room: socket_id={sid}")
             emit('error', {'message': 'Not in a room'})
             return
         
         logger.info(f"Start game request: room_id={room_id}, game_type={game_type}, reset_scores={reset_scores}")
         
         # Validate game type
-        try:
-            game_enum = GameType[game_type.upper()]
-        except KeyError:
+        game_enum = _GAME_TYPE_BY_NAME.get(game_type)
+        if game_enum is None:
             logger.warning(f"Invalid game type: {game_type}")
             emit('start_game_response', {
                 'success': False,
@@ -251,6 +286,12 @@ def handle_start_game(data):
         
         room_obj.start_game(game_enum, reset_scores=reset_scores)
         
+        # One manager per game, reused by every move until the game ends
+        game_mgr = create_game_manager(game_enum, room_obj)
+        room_obj._game_manager = game_mgr
+        if game_mgr:
+            game_mgr.start()
+        
         logger.info(f"Game started: room_id={room_id}, game_type={game_type}")
         
         emit('start_game_response', {'success': True})
@@ -260,7 +301,7 @@ def handle_start_game(data):
         }, room=room_id)
         
     except Exception as e:
-        logger.error(f"Error in handle_start_game: {e}", exc_info=True)
+        _log_exc('handle_start_game', e)
         emit('start_game_response', {
             'success': False,
             'error': 'Internal server error'
@@ -270,38 +311,38 @@ def handle_start_game(data):
 def handle_rps_choose(data):
     """Handle RPS move submission (server-authoritative)"""
     try:
-        player_id = socket_to_player.get(request.sid)
-        room_id = socket_to_room.get(request.sid)
+        sid = request.sid
+        state = session_table.state_of(sid)
+        player_id, room_id = state.player_id, state.room_id
         choice = (data.get('choice', '') or '').lower()
         
         if not player_id or not room_id:
-            logger.warning(f"RPS move from socket not in room: socket_id={request.sid}")
+            logger.warning(f"RPS move from socket not in room: socket_id={sid}")
             emit('rps:move_error', {'reason': 'not_in_room'})
             return
         
         logger.debug(f"RPS choice: room_id={room_id}, player_id={player_id}, choice={choice}")
         
         # Validate choice
-        valid_choices = ['rock', 'paper', 'scissors']
-        if choice not in valid_choices:
+        if choice not in _VALID_RPS:
             logger.warning(f"Invalid RPS choice: {choice}")
             emit('rps:move_error', {'reason': 'invalid_choice'})
             return
         
         # Get room and game
         room_obj = room_manager.get_room(room_id)
-        if not room_obj or not room_obj.current_game:
+        game_mgr = room_obj._game_manager if room_obj and room_obj.current_game else None
+        if game_mgr is None:
             logger.warning(f"RPS move in room without active game")
             emit('rps:move_error', {'reason': 'no_active_game'})
             return
         
-        # Process move through game manager
-        game_mgr = create_game_manager(room_obj.current_game.game_type, room_obj)
+        # Process move through the game's manager (created at start_game)
         result = game_mgr.process_move(player_id, {'choice': choice})
         
-        if not result['valid']:
-            logger.warning(f"RPS move validation failed: {result.get('message')}")
-            emit('rps:move_error', {'reason': result.get('message', 'invalid_move')})
+        if not result.valid:
+            logger.warning(f"RPS move validation failed: {result.message}")
+            emit('rps:move_error', {'reason': result.message or 'invalid_move'})
             return
         
         emit('rps:move_accepted', {'message': 'Move received'})
@@ -310,7 +351,8 @@ def handle_rps_choose(data):
         if game_mgr.is_game_complete():
             logger.info(f"RPS round complete: room_id={room_id}")
             results = game_mgr.get_results()
-            game_mgr.room.end_game(results)
+            room_obj.end_game(results)
+            room_obj._game_manager = None
             
             emit('rps:round_result', {
                 'choices': results.get('choices'),
@@ -320,23 +362,21 @@ def handle_rps_choose(data):
             }, room=room_id)
             
             # Emit new round signal so clients reset UI
-            emit('rps:new_round', {
-                'message': 'Next round starting...'
-            }, room=room_id)
+            emit('rps:new_round', _NEW_ROUND_PAYLOAD, room=room_id)
         else:
             logger.debug(f"Waiting for second player: room_id={room_id}")
-            emit('rps:waiting_for_opponent', {'message': 'Waiting for opponent...'}, room=room_id)
+            emit('rps:waiting_for_opponent', _WAITING_PAYLOAD, room=room_id)
         
     except Exception as e:
-        logger.error(f"Error in handle_rps_choose: {e}", exc_info=True)
+        _log_exc('handle_rps_choose', e)
         emit('rps:move_error', {'reason': 'server_error'})
 
 @socketio.on('chat:send_message')
 def handle_chat_message(data):
     """Handle chat message"""
     try:
-        player_id = socket_to_player.get(request.sid)
-        room_id = socket_to_room.get(request.sid)
+        state = session_table.state_of(request.sid)
+        player_id, room_id = state.player_id, state.room_id
         message = data.get('message', '').strip()
         
         if not player_id or not room_id:
@@ -349,39 +389,34 @@ def handle_chat_message(data):
         
         logger.debug(f"Chat message: room_id={room_id}, player_id={player_id}, len={len(message)}")
         
-        # Store in history
-        if room_id not in chat_history:
-            chat_history[room_id] = []
-        
-        chat_history[room_id].append({
+        chat_entry = {
             'player_id': player_id,
             'message': message,
-            'timestamp': time.time()
-        })
+            'ts_ms': now_ms()
+        }
+        
+        # Store in history
+        chat_store.append(room_id, chat_entry)
         
         # Broadcast to room
-        emit('chat_message', {
-            'player_id': player_id,
-            'message': message,
-            'timestamp': time.time()
-        }, room=room_id)
+        emit('chat_message', chat_entry, room=room_id)
         
     except Exception as e:
-        logger.error(f"Error in handle_chat_message: {e}", exc_info=True)
+        _log_exc('handle_chat_message', e)
 
 @socketio.on('chat:request_history')
 def handle_chat_history_request(data):
     """Send chat history for the current room"""
     try:
-        room_id = socket_to_room.get(request.sid)
+        room_id = session_table.state_of(request.sid).room_id
         
         if not room_id:
             return
         
-        history = chat_history.get(room_id, [])
+        history = chat_store.recent(room_id)
         logger.debug(f"Chat history requested: room_id={room_id}, messages={len(history)}")
         
         emit('chat_history', {'messages': history})
         
     except Exception as e:
-        logger.error(f"Error in handle_chat_history_request: {e}", exc_info=True)
+        _log_exc('handle_chat_history_request', e)
@@ -289,40 +289,7 @@ function setupSocketListeners() {
     });
 
     // ========== RPS Timer Events ==========
-    socketClient.on('rps_round_update', (data) => {
-        console.log('[RPS_EVENT] Round update:', data);
-        if (roomState.gameManager?.onRoundUpdate) {
-            roomState.gameManager.onRoundUpdate(data);
-        }
-    });
-
-    socketClient.on('rps_timer_tick', (data) => {
-        console.log(`[RPS_EVENT] Timer tick: ${data.remaining}s`);
-        if (roomState.gameManager?.onTimerTick) {
-            roomState.gameManager.onTimerTick(data);
-        }
-    });
-
-    socketClient.on('rps_player_ready', (data) => {
-        console.log('[RPS_EVENT] Player ready:', data);
-        if (roomState.gameManager?.onPlayerReady) {
-            roomState.gameManager.onPlayerReady(data);
-        }
-    });
-
-    socketClient.on('rps_result', (data) => {
-        console.log('[RPS_EVENT] Result:', data);
-        if (roomState.gameManager?.onResult) {
-            roomState.gameManager.onResult(data);
-        }
-    });
-
-    socketClient.on('rps_choice_response', (data) => {
-        console.log('[RPS_EVENT] Choice response:', data);
-        if (roomState.gameManager?.onChoiceResponse) {
-            roomState.gameManager.onChoiceResponse(data);
-        }
-    });
+    // The RPS game manager subscribes to its own round events (rps.js)
 
     socketClient.on('rps_start_response', (data) => {
         console.log('[RPS_EVENT] Start response:', data);
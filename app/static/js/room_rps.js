@@ -307,27 +307,27 @@ function setupSocketListeners() {
 // ============================================================================
 
 function setupRPSListeners() {
-    socketClient.on('rps:tick', (data) => {
-        // Timer tick from server
-        if (roomState.gameManager && roomState.gameManager.onTick) {
-            roomState.gameManager.onTick(data.remaining);
-        }
-    });
-
-    socketClient.on('rps:new_round', (data) => {
-        // Next round is starting
-        logger.info('[RPS] New round starting');
-        if (roomState.gameManager && roomState.gameManager.onNewRound) {
+    socketClient.on('rps:round_start', (data) => {
+        // Round is starting; the server sends no ticks, so count down locally
+        logger.info('[RPS] Round starting');
+        if (data.round_number > 1 && roomState.gameManager && roomState.gameManager.onNewRound) {
             roomState.gameManager.onNewRound(data);
         }
+        startRPSCountdown(data.duration);
     });
 
-    socketClient.on('rps:reveal_result', (data) => {
-        // Show round result
-        logger.info('[RPS] Reveal result');
-        if (roomState.gameManager && roomState.gameManager.revealResult) {
-            roomState.gameManager.revealResult(data);
+    socketClient.on('rps:round_complete', (data) => {
+        // Show round result, then start the next round after the reveal
+        logger.info('[RPS] Round complete');
+        if (data.reveal && roomState.gameManager && roomState.gameManager.revealResult) {
+            roomState.gameManager.revealResult(data.reveal);
         }
+        setTimeout(() => {
+            if (roomState.gameManager && roomState.gameManager.onNewRound) {
+                roomState.gameManager.onNewRound(data.next_round);
+            }
+            startRPSCountdown(data.next_round.duration);
+        }, data.next_round.starts_in * 1000);
     });
 
     socketClient.on('rps:choose_response', (data) => {
@@ -340,6 +340,35 @@ function setupRPSListeners() {
     });
 }
 
+let rpsCountdownFrame = null;
+
+function startRPSCountdown(duration) {
+    // Anchor on arrival time so client/server clock skew doesn't matter
+    const startedAt = performance.now();
+    let lastShown = null;
+
+    if (rpsCountdownFrame) {
+        cancelAnimationFrame(rpsCountdownFrame);
+    }
+
+    const step = () => {
+        const elapsed = (performance.now() - startedAt) / 1000;
+        const remaining = Math.ceil(duration - elapsed);
+        if (remaining <= 0) {
+            rpsCountdownFrame = null;
+            return;
+        }
+        if (remaining !== lastShown) {
+            lastShown = remaining;
+            if (roomState.gameManager && roomState.gameManager.onTick) {
+                roomState.gameManager.onTick(remaining);
+            }
+        }
+        rpsCountdownFrame = requestAnimationFrame(step);
+    };
+    step();
+}
+
 // ============================================================================
 // GAME UI INITIALIZATION
 // ============================================================================
@@ -15,6 +15,7 @@ class RockPaperScissorsGame {
         this.opponentScore = 0;
         this.scores = {};
         this.roundHistory = [];
+        this.countdownFrame = null;
     }
 
     render(container) {
@@ -119,10 +120,9 @@ class RockPaperScissorsGame {
 
     setupSocketListeners() {
         // RPS Timer events
-        socketClient.on('rps_round_update', (data) => this.onRoundUpdate(data));
-        socketClient.on('rps_timer_tick', (data) => this.onTimerTick(data));
-        socketClient.on('rps_player_ready', (data) => this.onPlayerReady(data));
-        socketClient.on('rps_result', (data) => this.onResult(data));
+        socketClient.on('rps:round_start', (data) => this.onRoundStart(data));
+        socketClient.on('rps:player_ready', (data) => this.onPlayerReady(data));
+        socketClient.on('rps:round_complete', (data) => this.onRoundComplete(data));
         socketClient.on('rps_choice_response', (data) => this.onChoiceResponse(data));
     }
 
@@ -149,10 +149,10 @@ class RockPaperScissorsGame {
         });
     }
 
-    onRoundUpdate(data) {
-        console.log('[RPS] Round update:', data);
+    onRoundStart(data) {
+        console.log('[RPS] Round start:', data);
         
-        this.currentRound = data.round;
+        this.currentRound = data.round_number;
         this.scores = data.scores || {};
         
         // Update round display
@@ -175,6 +175,30 @@ class RockPaperScissorsGame {
         this.myChoice = null;
         this.timerRunning = true;
         document.getElementById('rps-status').textContent = 'Make your choice!';
+
+        this.startCountdown(data.duration);
+    }
+
+    startCountdown(duration) {
+        // The server only announces the round; count down locally.
+        // Anchor on arrival time so client/server clock skew doesn't matter
+        const startedAt = performance.now();
+        let lastShown = null;
+
+        if (this.countdownFrame) {
+            cancelAnimationFrame(this.countdownFrame);
+        }
+
+        const step = () => {
+            const elapsed = (performance.now() - startedAt) / 1000;
+            const remaining = Math.max(0, Math.ceil(duration - elapsed));
+            if (remaining !== lastShown) {
+                lastShown = remaining;
+                this.onTimerTick({ remaining });
+            }
+            this.countdownFrame = remaining > 0 ? requestAnimationFrame(step) : null;
+        };
+        step();
     }
 
     onTimerTick(data) {
@@ -204,6 +228,14 @@ class RockPaperScissorsGame {
         }
     }
 
+    onRoundComplete(data) {
+        // One message carries the reveal and the next round's timing
+        if (data.reveal) {
+            this.onResult(data.reveal);
+        }
+        setTimeout(() => this.onRoundStart(data.next_round), data.next_round.starts_in * 1000);
+    }
+
     onPlayerReady(data) {
         console.log('[RPS] Player ready:', data);
         // Player submitted a choice
@@ -214,11 +246,10 @@ class RockPaperScissorsGame {
         console.log('[RPS] Result:', data);
 
         this.timerRunning = false;
-        const result = data.result;
+        const result = { player1: 'p1_win', player2: 'p2_win', draw: 'tie' }[data.winner];
         const p1Choice = data.p1_choice;
         const p2Choice = data.p2_choice;
         const winner = data.winner;
-        const reason = data.reason;
 
         // Map emoji
         const choiceEmoji = {
@@ -256,20 +287,16 @@ class RockPaperScissorsGame {
         roundResultEl.textContent = resultText;
         roundResultEl.className = `text-center mt-4 text-lg font-bold ${resultColor}`;
 
-        // Update final scores
-        const playerIds = Object.keys(data.scores).sort();
-        if (playerIds.length >= 2) {
-            document.getElementById('rps-my-score').textContent = data.scores[playerIds[0]] || 0;
-            document.getElementById('rps-opp-score').textContent = data.scores[playerIds[1]] || 0;
-        }
+        // Update final scores (players who haven't won yet have no entry)
+        document.getElementById('rps-my-score').textContent = data.scores[data.p1_id] || 0;
+        document.getElementById('rps-opp-score').textContent = data.scores[data.p2_id] || 0;
 
         document.getElementById('rps-status').textContent = `Next round in 1.5 seconds...`;
 
         // Store in history
         this.roundHistory.push({
-            round: data.round,
+            round: data.round_number,
             result: result,
-            reason: reason,
             scores: data.scores
         });
     }
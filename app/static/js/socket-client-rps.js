@@ -11,8 +11,11 @@ class SocketIOClient {
     }
 
     connect() {
+        // WebSocket-only unless the server allows polling (SUPPORT_POLLING)
+        const transports = (document.body.dataset.transports || 'websocket').split(',');
         this.socket = io({
-            transports: ['websocket', 'polling'],
+            transports: transports,
+            upgrade: transports.length > 1,
             reconnection: true,
             reconnectionAttempts: 10,
             reconnectionDelay: 1000,
@@ -33,14 +36,26 @@ class SocketIOClient {
             console.error('[Socket] Connection error:', error);
         });
 
-        // Forward all events to listeners
+        // Forward all events to listeners; coalesced 'batch' frames are
+        // unpacked and dispatched in order
         this.socket.onAny((eventName, ...args) => {
-            if (this.eventListeners[eventName]) {
-                this.eventListeners[eventName].forEach(callback => callback(...args));
+            if (eventName === 'batch') {
+                const batch = args[0];
+                batch.events.forEach(({ event, data, with_room }) => {
+                    this.dispatch(event, with_room ? { ...data, room: batch.room } : data);
+                });
+                return;
             }
+            this.dispatch(eventName, ...args);
         });
     }
 
+    dispatch(eventName, ...args) {
+        if (this.eventListeners[eventName]) {
+            this.eventListeners[eventName].forEach(callback => callback(...args));
+        }
+    }
+
     on(eventName, callback) {
         if (!this.eventListeners[eventName]) {
             this.eventListeners[eventName] = [];
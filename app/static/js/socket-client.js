@@ -32,11 +32,12 @@ class SocketClient {
     }
 
     connect() {
-        // Use WebSocket-only for stability
-        console.log('[SOCKET] Connecting with WebSocket transport...');
+        // WebSocket-only unless the server allows polling (SUPPORT_POLLING)
+        const transports = (document.body.dataset.transports || 'websocket').split(',');
+        console.log('[SOCKET] Connecting with transports:', transports);
         this.socket = io('/', { 
-            transports: ['websocket'],
-            upgrade: false,
+            transports: transports,
+            upgrade: transports.length > 1,
             reconnection: true,
             reconnectionDelay: 1000,
             reconnectionDelayMax: 5000,
@@ -67,6 +68,22 @@ class SocketClient {
             console.log('[SOCKET] Attempting to reconnect...');
         });
 
+        // Unpack coalesced room events and dispatch them in order; events
+        // flagged with_room share the one room snapshot sent with the batch
+        this.socket.on('batch', (data) => {
+            data.events.forEach(({ event, data: payload, with_room }) => {
+                this.emit(event, with_room ? { ...payload, room: data.room } : payload);
+            });
+        });
+
+        // A game move arrives as one packet: move_made, then game_ended on the last move
+        this.socket.on('game_update', (data) => {
+            this.emit('move_made', { player_id: data.player_id, room: data.room });
+            if (data.game_ended) {
+                this.emit('game_ended', { results: data.game_ended.results, room: data.room });
+            }
+        });
+
         // Relay all server events
         this.socket.on('connect_response', (data) => this.emit('connect_response', data));
         this.socket.on('join_room_response', (data) => this.emit('join_room_response', data));
@@ -84,10 +101,10 @@ class SocketClient {
         this.socket.on('game_switched', (data) => this.emit('game_switched', data));
         
         // RPS-specific events
-        this.socket.on('rps_round_update', (data) => this.emit('rps_round_update', data));
-        this.socket.on('rps_timer_tick', (data) => this.emit('rps_timer_tick', data));
-        this.socket.on('rps_choices_locked', (data) => this.emit('rps_choices_locked', data));
-        this.socket.on('rps_result', (data) => this.emit('rps_result', data));
+        this.socket.on('rps:round_start', (data) => this.emit('rps:round_start', data));
+        this.socket.on('rps:player_ready', (data) => this.emit('rps:player_ready', data));
+        this.socket.on('rps:round_complete', (data) => this.emit('rps:round_complete', data));
+        this.socket.on('rps_choice_response', (data) => this.emit('rps_choice_response', data));
     }
 
     joinRoom(roomId, displayName, avatarColor) {
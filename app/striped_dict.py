@@ -0,0 +1,61 @@
+"""
+PlaySync - Lock-striped dictionary
+Registries shared between socket handlers and background tasks (RPS games,
+socket/player maps) are split into shards, each with its own lock, so two
+rooms only contend when their keys hash to the same shard.
+"""
+
+import threading
+
+
+class StripedDict:
+    """Dict-like map whose operations lock only the shard owning the key"""
+
+    def __init__(self, shards=16):
+        # Power of two so the shard index is a mask, not a modulo
+        assert shards & (shards - 1) == 0, "shards must be a power of two"
+        self._mask = shards - 1
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+
+    def _shard(self, key):
+        return self._shards[hash(key) & self._mask]
+
+    def get(self, key, default=None):
+        data, lock = self._shard(key)
+        with lock:
+            return data.get(key, default)
+
+    def set(self, key, value):
+        data, lock = self._shard(key)
+        with lock:
+            data[key] = value
+
+    def swap(self, key, value):
+        """Store value and return whatever it replaced (or None), atomically"""
+        data, lock = self._shard(key)
+        with lock:
+            old = data.get(key)
+            data[key] = value
+            return old
+
+    def pop(self, key, default=None):
+        data, lock = self._shard(key)
+        with lock:
+            return data.pop(key, default)
+
+    def pop_if(self, key, value):
+        """Remove key only while it still maps to value; returns True if removed"""
+        data, lock = self._shard(key)
+        with lock:
+            if key in data and data[key] == value:
+                del data[key]
+                return True
+            return False
+
+    def __contains__(self, key):
+        data, lock = self._shard(key)
+        with lock:
+            return key in data
+
+    def __len__(self):
+        return sum(len(data) for data, _ in self._shards)
@@ -3,17 +3,26 @@ PlaySync - Main Application Entry Point
 """
 
 import os
+
+# Eventlet must patch the stdlib before anything else imports it
+if os.environ.get('ASYNC_MODE', 'eventlet') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+
+import logging
 import sys
 
 # Add app directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# INFO in production turns the handlers' debug logging into no-ops
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
+
 from app import create_app, socketio
 
 app, socketio = create_app()
 
 if __name__ == '__main__':
-    # Use threading for production deployment
     socketio.run(
         app,
         host='0.0.0.0',
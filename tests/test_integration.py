@@ -4,21 +4,26 @@ PlaySync Integration Test Suite
 Tests room creation, joining, and game flow with simulated socket clients
 """
 
+import os
 import sys
 import time
 import logging
-from threading import Thread
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import socket
 
+if __name__ == '__main__':
+    # Run as a script: make the repo root importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.room_manager import room_manager
+
 # Minimal socket.io client simulation for testing
 def test_room_creation_stress():
     """Test creating 100 rooms in rapid succession to reproduce crash"""
     print("\n=== TEST: Room Creation Stress Test ===")
     print("Creating 100 rooms rapidly...")
     
-    sys.path.insert(0, '/d:/sharing folder/PlaySync')
-    from app.room_manager import room_manager
-    
     try:
         room_ids = []
         start_time = time.time()
@@ -48,9 +53,6 @@ def test_join_flow():
     """Test join flow with proper player slot assignment"""
     print("\n=== TEST: Join Flow with Slot Assignment ===")
     
-    sys.path.insert(0, '/d:/sharing folder/PlaySync')
-    from app.room_manager import room_manager
-    
     try:
         # Create room
         room_id = room_manager.create_room()
@@ -96,9 +98,6 @@ def test_duplicate_join_prevention():
     """Test that same player cannot join twice"""
     print("\n=== TEST: Duplicate Join Prevention ===")
     
-    sys.path.insert(0, '/d:/sharing folder/PlaySync')
-    from app.room_manager import room_manager
-    
     try:
         room_id = room_manager.create_room()
         player_id = 'unique-player'
@@ -133,9 +132,6 @@ def test_room_expiry():
     """Test that rooms expire after timeout"""
     print("\n=== TEST: Room Expiry ===")
     
-    sys.path.insert(0, '/d:/sharing folder/PlaySync')
-    from app.room_manager import room_manager
-    
     try:
         # Create room with short timeout (2 seconds)
         room_id = room_manager.create_room(inactivity_timeout_seconds=2)
@@ -172,14 +168,15 @@ def test_thread_safety():
     """Test concurrent room operations don't cause race conditions"""
     print("\n=== TEST: Thread Safety ===")
     
-    sys.path.insert(0, '/d:/sharing folder/PlaySync')
-    from app.room_manager import room_manager
-    
     try:
         room_id = room_manager.create_room()
         errors = []
+        # All workers wait here so the joins really race instead of
+        # running one after another as the threads start
+        barrier = threading.Barrier(5)
         
         def join_player(player_num):
+            barrier.wait()
             try:
                 result = room_manager.join_room(
                     room_id, 
@@ -193,14 +190,8 @@ def test_thread_safety():
                 errors.append(f"Player {player_num} error: {e}")
         
         # Try concurrent joins
-        threads = []
-        for i in range(5):  # 5 threads, but room max is 2
-            t = Thread(target=join_player, args=(i,))
-            threads.append(t)
-            t.start()
-        
-        for t in threads:
-            t.join()
+        with ThreadPoolExecutor(max_workers=5) as pool:  # 5 threads, but room max is 2
+            list(pool.map(join_player, range(5)))
         
         room = room_manager.get_room(room_id)
         final_count = room.get_player_count()
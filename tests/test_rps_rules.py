@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+PlaySync RPS Rules Tests
+Round outcomes for every choice pair and client choice parsing
+"""
+
+import os
+import sys
+
+if __name__ == '__main__':
+    # Run as a script: make the repo root importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rps_manager import RPSRoundState, parse_choice
+
+# Classic rules, written out independently of the mod-3 outcome table
+BEATS = {'rock': 'scissors', 'paper': 'rock', 'scissors': 'paper'}
+CHOICES = ('rock', 'paper', 'scissors', 'none')
+
+
+def expected_winner(p1, p2):
+    if p1 == p2:
+        return 'draw'  # Includes both players missing the timer
+    if p1 == 'none':
+        return 'player2'
+    if p2 == 'none':
+        return 'player1'
+    return 'player1' if BEATS[p1] == p2 else 'player2'
+
+
+def test_round_outcomes():
+    """All 16 (p1, p2) combinations of rock/paper/scissors/none"""
+    for p1 in CHOICES:
+        for p2 in CHOICES:
+            round_state = RPSRoundState()
+            round_state.choices = {'p1': p1, 'p2': p2}
+            winner = round_state._compute_winner(('p1', 'p2'))
+            assert winner == expected_winner(p1, p2), (p1, p2, winner)
+
+
+def test_round_outcome_needs_two_players():
+    round_state = RPSRoundState()
+    round_state.choices = {'p1': 'rock'}
+    assert round_state._compute_winner(('p1',)) is None
+
+
+def test_parse_choice():
+    cases = [
+        ('rock', 'rock'),
+        ('R', 'rock'),
+        ('Rock', 'rock'),
+        ('r', 'rock'),
+        ('PAPER', 'paper'),
+        ('s', 'scissors'),
+        ('', None),
+        ('lizard', None),
+        (None, None),
+        (1, None),
+    ]
+    for raw, expected in cases:
+        assert parse_choice(raw) == expected, (raw, parse_choice(raw))
+
+
+def run_all_tests():
+    """Run all tests"""
+    tests = [test_round_outcomes, test_round_outcome_needs_two_players, test_parse_choice]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"PASS: {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL: {test.__name__} {e}")
+    return failed == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_all_tests() else 1)
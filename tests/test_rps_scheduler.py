@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+PlaySync RPS Scheduler Tests
+Deadline ordering, re-scheduling, error isolation and stale RPS timers
+on the shared round scheduler
+"""
+
+import os
+import sys
+import threading
+import time
+
+if __name__ == '__main__':
+    # Run as a script: make the repo root importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import rps_scheduler
+from app.rps_manager import RockPaperScissorsManager, RPSRoundState
+
+WAIT_SECONDS = 2
+
+
+def setup_module(module=None):
+    """Drive the scheduler from a plain thread instead of a Socket.IO background task"""
+    with rps_scheduler._cond:
+        if not rps_scheduler._task_started:
+            rps_scheduler._task_started = True
+            threading.Thread(target=rps_scheduler._run, daemon=True).start()
+
+
+class FakeRoom:
+    """Just enough of Room for RockPaperScissorsManager"""
+    def __init__(self):
+        self.room_id = 'TESTROOM'
+        self.players = {}  # Empty, so _safe_emit never reaches Socket.IO
+        self.player_order = ['p1', 'p2']
+        self.current_game = None
+
+
+def test_deadline_ordering():
+    """Callbacks fire in deadline order, not scheduling order"""
+    fired = []
+    done = threading.Event()
+    
+    def record(name):
+        fired.append(name)
+        if len(fired) == 3:
+            done.set()
+    
+    rps_scheduler.schedule(0.06, record, 'c')
+    rps_scheduler.schedule(0.02, record, 'a')
+    rps_scheduler.schedule(0.04, record, 'b')
+    
+    assert done.wait(WAIT_SECONDS)
+    assert fired == ['a', 'b', 'c']
+
+
+def test_reschedule_from_callback():
+    """A callback can schedule the next timer without deadlocking the task"""
+    fired = []
+    done = threading.Event()
+    
+    def tick(n):
+        fired.append(n)
+        if n < 3:
+            rps_scheduler.schedule(0.01, tick, n + 1)
+        else:
+            done.set()
+    
+    rps_scheduler.schedule(0.01, tick, 1)
+    
+    assert done.wait(WAIT_SECONDS)
+    assert fired == [1, 2, 3]
+
+
+def test_raising_callback_keeps_loop_alive():
+    """An exception in one callback is logged and later timers still fire"""
+    done = threading.Event()
+    
+    def boom():
+        raise RuntimeError("callback failure")
+    
+    rps_scheduler.schedule(0.01, boom)
+    rps_scheduler.schedule(0.02, done.set)
+    
+    assert done.wait(WAIT_SECONDS)
+
+
+def test_stale_generation_is_noop():
+    """Timers from before stop()/start() must not touch the new game"""
+    mgr = RockPaperScissorsManager(FakeRoom())
+    mgr.start()
+    old_generation = mgr._generation
+    mgr.stop()
+    mgr.start()
+    
+    try:
+        current_round = mgr.current_round
+        mgr._on_round_end(old_generation)
+        mgr._on_next_round(old_generation)
+        
+        assert mgr.current_round is current_round
+        assert current_round.timer_running
+        assert mgr.rounds_completed == []
+        
+        # After stop() even the current generation's timers do nothing
+        mgr.stop()
+        mgr._on_round_end(mgr._generation)
+        assert current_round.timer_running
+        assert mgr.rounds_completed == []
+    finally:
+        mgr.stop()
+
+
+def run_all_tests():
+    """Run all tests"""
+    setup_module()
+    tests = [
+        test_deadline_ordering,
+        test_reschedule_from_callback,
+        test_raising_callback_keeps_loop_alive,
+        test_stale_generation_is_noop,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"PASS: {test.__name__}")
+        except AssertionError:
+            failed += 1
+            print(f"FAIL: {test.__name__}")
+    return failed == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_all_tests() else 1)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+PlaySync Shared State Tests
+StripedDict, SessionTable and the ChatStore trim query
+"""
+
+import os
+import sys
+
+if __name__ == '__main__':
+    # Run as a script: make the repo root importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.striped_dict import StripedDict
+from app.session import SessionTable, NO_SOCKET
+from app.chat_store import ChatStore, CHAT_HISTORY_SIZE, CHAT_TTL_SECONDS, now_ms
+
+
+def test_striped_dict_basic_ops():
+    d = StripedDict(shards=4)
+    assert d.get('a') is None and d.get('a', 1) == 1
+    d.set('a', 1)
+    assert 'a' in d and d.get('a') == 1
+    assert d.swap('a', 2) == 1 and d.get('a') == 2
+    assert d.swap('b', 3) is None
+    assert len(d) == 2
+    assert d.pop('a') == 2 and 'a' not in d
+    assert d.pop('a', 'gone') == 'gone'
+    assert len(d) == 1
+
+
+def test_striped_dict_pop_if():
+    d = StripedDict()
+    d.set('room', 'old')
+    assert not d.pop_if('room', 'other')  # Replaced since: keep it
+    assert d.get('room') == 'old'
+    assert d.pop_if('room', 'old')
+    assert not d.pop_if('room', 'old')
+    assert 'room' not in d
+
+
+def test_striped_dict_rejects_non_power_of_two():
+    try:
+        StripedDict(shards=3)
+    except AssertionError:
+        return
+    raise AssertionError("shards=3 should be rejected")
+
+
+def test_session_table_link_and_lookup():
+    table = SessionTable()
+    table.link('sid1', 'player1', 'ROOM1234')
+    state = table.state_of('sid1')
+    assert (state.player_id, state.room_id) == ('player1', 'ROOM1234')
+    assert table.player_of('sid1') == 'player1'
+    assert table.socket_of('player1') == 'sid1'
+    assert table.state_of('unknown') is NO_SOCKET
+    assert table.player_of('unknown') is None
+
+
+def test_session_table_reconnect_keeps_new_socket():
+    """Dropping the old socket must not unlink a player who already reconnected"""
+    table = SessionTable()
+    table.link('old', 'player1', 'ROOM1234')
+    table.link('new', 'player1', 'ROOM1234')
+    assert table.unlink('old') == 'player1'
+    assert table.socket_of('player1') == 'new'
+    assert table.unlink('new') == 'player1'
+    assert table.socket_of('player1') is None
+    assert table.pop('new') is None
+
+
+def _chat_store():
+    store = ChatStore()
+    store._trim_started = True  # No Socket.IO background task in tests
+    return store
+
+
+def _entry(n, ts_ms=None):
+    return {'player_id': 'p', 'display_name': 'P', 'avatar_color': '#fff',
+            'message': f"msg {n}", 'ts_ms': ts_ms}
+
+
+def test_chat_store_trim_keeps_last_window_per_room():
+    store = _chat_store()
+    for n in range(CHAT_HISTORY_SIZE + 10):
+        store.append('ROOMAAAA', _entry(n))
+    for n in range(5):
+        store.append('ROOMBBBB', _entry(n))
+    
+    store.trim()
+    
+    room_a = store.recent('ROOMAAAA', limit=CHAT_HISTORY_SIZE * 2)
+    assert len(room_a) == CHAT_HISTORY_SIZE
+    assert room_a[0]['message'] == 'msg 10'
+    assert room_a[-1]['message'] == f"msg {CHAT_HISTORY_SIZE + 9}"
+    assert len(store.recent('ROOMBBBB')) == 5
+
+
+def test_chat_store_trim_drops_messages_past_ttl():
+    store = _chat_store()
+    stale = now_ms() - CHAT_TTL_SECONDS * 1000 - 1
+    store.append('ROOMAAAA', _entry('old', ts_ms=stale))
+    store.append('ROOMAAAA', _entry('new'))
+    
+    store.trim()
+    
+    assert [m['message'] for m in store.recent('ROOMAAAA')] == ['msg new']
+
+
+def test_chat_store_forget():
+    store = _chat_store()
+    store.append('ROOMAAAA', _entry(1))
+    store.append('ROOMBBBB', _entry(2))
+    store.forget('ROOMAAAA')
+    assert store.recent('ROOMAAAA') == []
+    assert len(store.recent('ROOMBBBB')) == 1
+
+
+def run_all_tests():
+    """Run all tests"""
+    tests = [
+        test_striped_dict_basic_ops,
+        test_striped_dict_pop_if,
+        test_striped_dict_rejects_non_power_of_two,
+        test_session_table_link_and_lookup,
+        test_session_table_reconnect_keeps_new_socket,
+        test_chat_store_trim_keeps_last_window_per_room,
+        test_chat_store_trim_drops_messages_past_ttl,
+        test_chat_store_forget,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"PASS: {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL: {test.__name__} {e}")
+    return failed == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_all_tests() else 1)